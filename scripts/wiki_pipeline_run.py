@@ -0,0 +1,7 @@
+#!/usr/bin/env python
+
+from melvor_wiki_bot.pipeline import main
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+#!/usr/bin/env python
+
+from melvor_wiki_bot.rag.snapshots import main
+
+
+if __name__ == "__main__":
+    main()
@@ -6,4 +6,5 @@ DOCS_DIR = PROJECT_ROOT / "docs"
 OUTPUTS_DIR = PROJECT_ROOT / "outputs"
 
 WIKI_MANIFEST_PATH = DOCS_DIR / "wiki_manifest.json"
-WIKI_PAGE_REGISTRY_PATH = DOCS_DIR / "wiki_page_registry.json"
\ No newline at end of file
+WIKI_PAGE_REGISTRY_PATH = DOCS_DIR / "wiki_page_registry.json"
+RETRIEVAL_GOLDEN_SET_PATH = DOCS_DIR / "retrieval_golden_set.json"
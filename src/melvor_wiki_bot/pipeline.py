@@ -0,0 +1,244 @@
+"""
+Pipelined scrape -> chunk -> embed refresh.
+
+Runs the three stages as threads connected by bounded queues instead of
+three batch jobs handing off through files:
+
+  scrape  fetches each manifest page (journal + retry/backoff, resumable)
+          and writes its structured JSON; pages already done are read back
+          from disk instead of refetched
+  chunk   chunks each page as soon as it arrives, with near-duplicate
+          collapsing
+  embed   embeds canonical chunks in batches while later pages are still
+          downloading
+
+The bounded queues apply backpressure between stages, so end-to-end time
+tends towards the slowest stage rather than the sum of all three. They do
+not bound total memory: canonical chunks and their embeddings are buffered
+until wiki_chunks.jsonl and wiki_embeddings.jsonl are written atomically at
+the end, so a crash never leaves a half-written artifact.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from melvor_wiki_bot.config import OUTPUTS_DIR
+from melvor_wiki_bot.rag.chunking import WikiChunk, make_chunks_for_page, write_chunks
+from melvor_wiki_bot.rag.dedup import NearDuplicateIndex
+from melvor_wiki_bot.rag.embeddings import EMBEDDING_MODEL, embed_texts, write_embeddings
+from melvor_wiki_bot.wiki.journal import ScrapeJournal
+from melvor_wiki_bot.wiki.manifest import WikiManifestEntry, load_manifest
+from melvor_wiki_bot.wiki.scrape import RetryPolicy, scrape_page_to_file
+
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+@dataclass
+class PipelineResult:
+    chunks_path: Path
+    embeddings_path: Path
+    pages: int = 0
+    failed_pages: List[str] = field(default_factory=list)
+    chunks: int = 0
+    duplicates: int = 0
+    # Busy seconds per stage (excluding time blocked on queues) and wall time.
+    stage_seconds: Dict[str, float] = field(default_factory=dict)
+    wall_seconds: float = 0.0
+
+
+class _Stop(Exception):
+    pass
+
+
+def _put(q: queue.Queue, item: Any, stop: threading.Event) -> None:
+    while True:
+        if stop.is_set():
+            raise _Stop()
+        try:
+            q.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+
+def _get(q: queue.Queue, stop: threading.Event) -> Any:
+    while True:
+        if stop.is_set():
+            raise _Stop()
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+
+
+def run_pipeline(
+    manifest: List[WikiManifestEntry] | None = None,
+    structured_dir: Path | None = None,
+    output_dir: Path | None = None,
+    resume: bool = True,
+    policy: RetryPolicy | None = None,
+    dedup: bool = True,
+    dedup_threshold: float = 0.9,
+    embed_batch_size: int = 32,
+    queue_size: int = 8,
+    embed_fn: Callable[[List[str]], List[List[float]]] = embed_texts,
+    embedding_model: str | None = None,
+) -> PipelineResult:
+    """
+    Refresh wiki_chunks.jsonl and wiki_embeddings.jsonl from the manifest.
+
+    `embedding_model` names the backend behind `embed_fn`; it goes into each
+    row's text_key, so a snapshot only reuses vectors from the same model.
+    It is required whenever `embed_fn` is not the default embed_texts.
+    """
+    if embedding_model is None:
+        if embed_fn is not embed_texts:
+            raise ValueError("embedding_model is required with a custom embed_fn")
+        embedding_model = EMBEDDING_MODEL
+    structured_dir = structured_dir or (OUTPUTS_DIR / "wiki_structured")
+    output_dir = output_dir or (OUTPUTS_DIR / "wiki_chunks")
+    structured_dir.mkdir(parents=True, exist_ok=True)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = manifest if manifest is not None else load_manifest()
+    journal = ScrapeJournal(structured_dir / "scrape_journal.jsonl")
+    if not resume:
+        journal.reset()
+
+    result = PipelineResult(
+        chunks_path=output_dir / "wiki_chunks.jsonl",
+        embeddings_path=output_dir / "wiki_embeddings.jsonl",
+    )
+    pages_q: queue.Queue = queue.Queue(maxsize=queue_size)
+    chunks_q: queue.Queue = queue.Queue(maxsize=queue_size * embed_batch_size)
+    stop = threading.Event()
+    errors: List[BaseException] = []
+    busy = {"scrape": 0.0, "chunk": 0.0, "embed": 0.0}
+
+    dup_index = NearDuplicateIndex(threshold=dedup_threshold) if dedup else None
+    canonical: List[WikiChunk] = []
+    vectors: List[Tuple[str, str, List[float]]] = []
+
+    def scrape_stage() -> None:
+        for entry in manifest:
+            t0 = time.perf_counter()
+            target = structured_dir / f"{entry.page_id}.json"
+            if journal.is_done(entry.page_id, entry.url) and target.exists():
+                page = json.loads(target.read_text(encoding="utf-8"))
+            else:
+                page = scrape_page_to_file(entry, structured_dir, journal, policy=policy)
+                if page is None:
+                    result.failed_pages.append(entry.page_id)
+                    # Keep serving the last good copy rather than dropping
+                    # the page from the artifacts, as make_chunks would.
+                    if target.exists():
+                        page = json.loads(target.read_text(encoding="utf-8"))
+            busy["scrape"] += time.perf_counter() - t0
+            if page is None:
+                continue
+            result.pages += 1
+            _put(pages_q, (entry, page), stop)
+
+    def chunk_stage() -> None:
+        while True:
+            item = _get(pages_q, stop)
+            if item is _END:
+                return
+            t0 = time.perf_counter()
+            entry, page = item
+            new_chunks: List[WikiChunk] = []
+            for chunk in make_chunks_for_page(page, category=entry.category):
+                if dup_index is None or dup_index.add(chunk) is not None:
+                    canonical.append(chunk)
+                    new_chunks.append(chunk)
+            busy["chunk"] += time.perf_counter() - t0
+            for chunk in new_chunks:
+                _put(chunks_q, chunk, stop)
+
+    def embed_stage() -> None:
+        batch: List[WikiChunk] = []
+
+        def flush() -> None:
+            t0 = time.perf_counter()
+            embedded = embed_fn([c.text for c in batch])
+            if len(embedded) != len(batch):
+                raise RuntimeError("embed_texts returned mismatched vector count")
+            vectors.extend((c.chunk_id, c.text, vec) for c, vec in zip(batch, embedded))
+            batch.clear()
+            busy["embed"] += time.perf_counter() - t0
+
+        while True:
+            item = _get(chunks_q, stop)
+            if item is _END:
+                break
+            batch.append(item)
+            if len(batch) >= embed_batch_size:
+                flush()
+        if batch:
+            flush()
+
+    def run(stage: Callable[[], None], downstream: queue.Queue | None) -> None:
+        try:
+            stage()
+        except _Stop:
+            return
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+            return
+        if downstream is not None:
+            try:
+                _put(downstream, _END, stop)
+            except _Stop:
+                pass
+
+    start = time.perf_counter()
+    threads = [
+        threading.Thread(target=run, args=(scrape_stage, pages_q), name="pipeline-scrape"),
+        threading.Thread(target=run, args=(chunk_stage, chunks_q), name="pipeline-chunk"),
+        threading.Thread(target=run, args=(embed_stage, None), name="pipeline-embed"),
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if errors:
+        raise errors[0]
+
+    # Chunks are written last: duplicates found on later pages are folded
+    # into canonical chunks that were already handed to the embedder.
+    write_chunks(result.chunks_path, canonical)
+    write_embeddings(result.embeddings_path, vectors, model=embedding_model)
+
+    result.chunks = len(canonical)
+    result.duplicates = dup_index.num_duplicates if dup_index is not None else 0
+    result.stage_seconds = dict(busy)
+    result.wall_seconds = time.perf_counter() - start
+    return result
+
+
+def main() -> None:
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    result = run_pipeline(resume="--restart" not in sys.argv[1:])
+    print(f"Pages: {result.pages} (failed: {len(result.failed_pages)})")
+    print(f"Chunks: {result.chunks} (+{result.duplicates} near-duplicates collapsed)")
+    stages = ", ".join(f"{name} {secs:.1f}s" for name, secs in result.stage_seconds.items())
+    print(f"Stage busy time: {stages}; wall time {result.wall_seconds:.1f}s")
+    print(f"Wrote {result.chunks_path} and {result.embeddings_path}")
+
+
+if __name__ == "__main__":
+    main()
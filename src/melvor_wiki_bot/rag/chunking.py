@@ -3,9 +3,11 @@ from __future__ import annotations
 import json
 from dataclasses import dataclass, asdict
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List
 
 from melvor_wiki_bot.config import OUTPUTS_DIR
+from melvor_wiki_bot.fileio import atomic_write
+from melvor_wiki_bot.rag.dedup import NearDuplicateIndex
 from melvor_wiki_bot.wiki.manifest import load_manifest
 
 
@@ -59,6 +61,7 @@ def make_chunks_for_page(
             "section_index": idx,
             "category": category,
             "heading_level": heading_level,
+            "links": list(section.get("links") or []),
         }
 
         chunks.append(
@@ -78,10 +81,25 @@ def make_chunks_for_page(
     return chunks
 
 
+def write_chunks(chunks_path: Path, chunks: Iterable[WikiChunk]) -> None:
+    with atomic_write(chunks_path) as f:
+        for chunk in chunks:
+            f.write(json.dumps(asdict(chunk), ensure_ascii=False) + "\n")
+
+
 def make_chunks(
     structured_dir: Path | None = None,
     output_dir: Path | None = None,
+    dedup: bool = True,
+    dedup_threshold: float = 0.9,
 ) -> Path:
+    """
+    Chunk every structured page into wiki_chunks.jsonl.
+
+    With `dedup` enabled, near-identical chunks (nav templates, repeated
+    lead boilerplate) are collapsed to the first copy; the others are kept
+    as back-references in its `meta["duplicates"]`.
+    """
     structured_dir = structured_dir or (OUTPUTS_DIR / "wiki_structured")
     output_dir = output_dir or (OUTPUTS_DIR / "wiki_chunks")
     output_dir.mkdir(parents=True, exist_ok=True)
@@ -91,18 +109,21 @@ def make_chunks(
     manifest_categories = _load_manifest_categories()
 
     all_chunks: List[WikiChunk] = []
+    dup_index = NearDuplicateIndex(threshold=dedup_threshold) if dedup else None
 
     for path in sorted(structured_dir.glob("*.json")):
         page = _load_structured_page(path)
         page_id = page["page_id"]
         category = manifest_categories.get(page_id)
         page_chunks = make_chunks_for_page(page, category=category)
-        all_chunks.extend(page_chunks)
-
-    with chunks_path.open("w", encoding="utf-8") as f:
-        for chunk in all_chunks:
-            f.write(json.dumps(asdict(chunk), ensure_ascii=False) + "\n")
+        if dup_index is None:
+            all_chunks.extend(page_chunks)
+            continue
+        for chunk in page_chunks:
+            if dup_index.add(chunk) is not None:
+                all_chunks.append(chunk)
 
+    write_chunks(chunks_path, all_chunks)
     return chunks_path
 
 
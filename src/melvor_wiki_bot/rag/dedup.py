@@ -0,0 +1,137 @@
+"""
+Near-duplicate chunk detection (MinHash + LSH banding).
+
+Navigation templates and boilerplate lead sections repeat across many wiki
+pages. NearDuplicateIndex is fed chunks one at a time; the first copy of a
+text becomes the canonical chunk and every later near-identical copy is
+folded into the canonical chunk's `meta["duplicates"]` as a back-reference,
+so each distinct text is embedded and scored once.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import random
+import re
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Tuple
+
+if TYPE_CHECKING:
+    from melvor_wiki_bot.rag.chunking import WikiChunk
+
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_WORD_RE = re.compile(r"\w+")
+
+
+def _shingles(text: str, size: int) -> set[str]:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return {" ".join(words)}
+    return {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._perms: List[Tuple[int, int]] = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        hashes = [_hash64(s) for s in _shingles(text, self.shingle_size)]
+        sig: List[int] = []
+        for a, b in self._perms:
+            sig.append(min((a * h + b) % _MERSENNE_PRIME for h in hashes))
+        return tuple(sig)
+
+
+def estimate_jaccard(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+    if not a or len(a) != len(b):
+        return 0.0
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+def _back_reference(chunk: WikiChunk) -> Dict[str, Any]:
+    return {
+        "chunk_id": chunk.chunk_id,
+        "page_id": chunk.page_id,
+        "page_title": chunk.page_title,
+        "url": chunk.url,
+        "heading_id": chunk.heading_id,
+        "heading_text": chunk.heading_text,
+        "category": chunk.meta.get("category"),
+    }
+
+
+class NearDuplicateIndex:
+    """
+    Incremental near-duplicate detector.
+
+    Signatures are split into `bands` LSH bands; chunks sharing any band
+    bucket are compared on estimated Jaccard similarity and merged when it
+    reaches `threshold`.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        num_perm: int = 64,
+        bands: int = 8,
+        shingle_size: int = 3,
+    ):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size)
+        self.canonical: List[WikiChunk] = []
+        self._signatures: List[Tuple[int, ...]] = []
+        self._buckets: List[Dict[Tuple[int, ...], List[int]]] = [{} for _ in range(bands)]
+        self.num_duplicates = 0
+
+    def _band_keys(self, sig: Tuple[int, ...]) -> List[Tuple[int, ...]]:
+        return [sig[b * self.rows : (b + 1) * self.rows] for b in range(self.bands)]
+
+    def add(self, chunk: WikiChunk) -> WikiChunk | None:
+        """
+        Register a chunk.
+
+        Returns the chunk itself when it is new (canonical), or None when it
+        was folded into an existing canonical chunk.
+        """
+        sig = self.hasher.signature(chunk.text)
+        keys = self._band_keys(sig)
+
+        seen: set[int] = set()
+        for band, key in enumerate(keys):
+            for pos in self._buckets[band].get(key, ()):
+                if pos in seen:
+                    continue
+                seen.add(pos)
+                if estimate_jaccard(sig, self._signatures[pos]) >= self.threshold:
+                    owner = self.canonical[pos]
+                    owner.meta.setdefault("duplicates", []).append(_back_reference(chunk))
+                    self.num_duplicates += 1
+                    return None
+
+        pos = len(self.canonical)
+        self.canonical.append(chunk)
+        self._signatures.append(sig)
+        for band, key in enumerate(keys):
+            self._buckets[band].setdefault(key, []).append(pos)
+        return chunk
+
+
+def dedup_chunks(chunks: Iterable[WikiChunk], threshold: float = 0.9) -> List[WikiChunk]:
+    index = NearDuplicateIndex(threshold=threshold)
+    for chunk in chunks:
+        index.add(chunk)
+    return index.canonical
@@ -1,10 +1,27 @@
 from __future__ import annotations
 
+import hashlib
 import json
 from pathlib import Path
-from typing import Iterable, List, Sequence
+from typing import Iterable, List, Sequence, Tuple
 
 from melvor_wiki_bot.config import OUTPUTS_DIR
+from melvor_wiki_bot.fileio import atomic_write
+
+
+# Identifies the embedding backend; snapshot vector objects are keyed on it,
+# so bump it whenever embed_texts changes.
+EMBEDDING_MODEL = "placeholder-length-v0"
+
+
+def text_key(text: str, model: str = EMBEDDING_MODEL) -> str:
+    """
+    Identity of an embedding: which model embedded which text. Stored with
+    every row so consumers can tell whether a vector matches a chunk's
+    current text.
+    """
+    payload = json.dumps({"model": model, "text": text}, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 
 def _load_chunks(chunks_path: Path) -> list[dict]:
@@ -37,6 +54,25 @@ def embed_texts(texts: Sequence[str]) -> List[List[float]]:
     return vectors
 
 
+def write_embeddings(
+    embeddings_path: Path,
+    rows: Iterable[Tuple[str, str, List[float]]],
+    model: str = EMBEDDING_MODEL,
+) -> None:
+    """
+    Write (chunk_id, text, embedding) rows; the text itself is stored only
+    as its text_key. `model` must name the backend that produced the vectors.
+    """
+    with atomic_write(embeddings_path) as f:
+        for cid, text, vec in rows:
+            row = {
+                "chunk_id": cid,
+                "text_key": text_key(text, model),
+                "embedding": vec,
+            }
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
 def make_embeddings(
     chunks_path: Path | None = None,
     output_dir: Path | None = None,
@@ -48,7 +84,7 @@ def make_embeddings(
       - wiki_chunks.jsonl (one JSON object per chunk)
     Output:
       - wiki_embeddings.jsonl (one JSON object per chunk):
-        { "chunk_id": "...", "embedding": [..numbers..] }
+        { "chunk_id": "...", "text_key": "...", "embedding": [..numbers..] }
     """
     chunks_path = chunks_path or (OUTPUTS_DIR / "wiki_chunks" / "wiki_chunks.jsonl")
     out_root = output_dir or (OUTPUTS_DIR / "wiki_chunks")
@@ -63,14 +99,7 @@ def make_embeddings(
     if len(vectors) != len(chunk_ids):
         raise RuntimeError("embed_texts returned mismatched vector count")
 
-    with embeddings_path.open("w", encoding="utf-8") as f:
-        for cid, vec in zip(chunk_ids, vectors):
-            row = {
-                "chunk_id": cid,
-                "embedding": vec,
-            }
-            f.write(json.dumps(row, ensure_ascii=False) + "\n")
-
+    write_embeddings(embeddings_path, zip(chunk_ids, texts, vectors))
     return embeddings_path
 
 
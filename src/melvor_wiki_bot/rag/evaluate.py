@@ -0,0 +1,207 @@
+"""
+Retrieval evaluation harness: recall@k curves, MRR and latency per retrieval mode.
+
+Golden set format (docs/retrieval_golden_set.json):
+
+    [
+      {
+        "question": "...",
+        "expected": [{"page_id": "ranged", "heading_id": "Ammunition"}, ...],
+        "filters": {"include": {"category": [...]}, "exclude": {...}}   # optional
+      }
+    ]
+
+A `heading_id` of null matches any section of the page. A hit also matches
+through the back-references of a deduplicated chunk.
+
+Modes:
+  exact        search_chunks over full-precision vectors
+  filtered     exact search with the question's filters (default: exclude meta)
+  hybrid       search_cascade: vector first stage + title/heading reranker
+  approximate  int8 quantized scores only, no rescoring
+  quantized    int8 quantized first stage + exact rescoring
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from melvor_wiki_bot.config import OUTPUTS_DIR, RETRIEVAL_GOLDEN_SET_PATH
+from melvor_wiki_bot.rag.index import ChunkIndex, load_index
+from melvor_wiki_bot.rag.retrieval import RetrievalResult, search_cascade, search_chunks
+
+
+MODES = ("exact", "filtered", "hybrid", "approximate", "quantized")
+
+DEFAULT_KS = (1, 3, 5, 10)
+
+DEFAULT_FILTERS = {"exclude": {"category": ["meta"]}}
+
+SearchFn = Callable[[Dict[str, Any], int], List[RetrievalResult]]
+
+
+def load_golden_set(path: Path | None = None) -> List[Dict[str, Any]]:
+    golden_path = path or RETRIEVAL_GOLDEN_SET_PATH
+    with golden_path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _result_keys(result: RetrievalResult) -> List[Tuple[str, str | None]]:
+    keys = [(result.page_id, result.heading_id)]
+    for ref in result.duplicates:
+        keys.append((ref.get("page_id"), ref.get("heading_id")))
+    return keys
+
+
+def _matches(result: RetrievalResult, expected: Dict[str, Any]) -> bool:
+    page_id = expected["page_id"]
+    heading_id = expected.get("heading_id")
+    for key_page, key_heading in _result_keys(result):
+        if key_page == page_id and (heading_id is None or key_heading == heading_id):
+            return True
+    return False
+
+
+def _percentile(values: Sequence[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * pct / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def recall_at(results: Sequence[RetrievalResult], expected: Sequence[Dict[str, Any]], k: int) -> float:
+    top = list(results)[:k]
+    found = sum(1 for exp in expected if any(_matches(r, exp) for r in top))
+    return found / len(expected) if expected else 0.0
+
+
+def reciprocal_rank(results: Sequence[RetrievalResult], expected: Sequence[Dict[str, Any]]) -> float:
+    for rank, r in enumerate(results, start=1):
+        if any(_matches(r, exp) for exp in expected):
+            return 1.0 / rank
+    return 0.0
+
+
+def build_modes(exact: ChunkIndex, quantized: ChunkIndex) -> Dict[str, SearchFn]:
+    def _filters(item: Dict[str, Any]) -> Dict[str, Any]:
+        return item.get("filters") or DEFAULT_FILTERS
+
+    return {
+        "exact": lambda item, k: search_chunks(item["question"], top_k=k, index=exact),
+        "filtered": lambda item, k: search_chunks(
+            item["question"],
+            top_k=k,
+            index=exact,
+            include=_filters(item).get("include"),
+            exclude=_filters(item).get("exclude"),
+        ),
+        "hybrid": lambda item, k: search_cascade(item["question"], top_k=k, index=exact),
+        "approximate": lambda item, k: search_chunks(item["question"], top_k=k, index=quantized, rescore=False),
+        "quantized": lambda item, k: search_chunks(item["question"], top_k=k, index=quantized),
+    }
+
+
+def evaluate(
+    golden: Sequence[Dict[str, Any]],
+    modes: Dict[str, SearchFn],
+    ks: Sequence[int] = DEFAULT_KS,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Run every mode over the golden set once at max(ks) and report recall at
+    each k (the recall@k curve), MRR and per-query latency percentiles.
+    """
+    ks = sorted(set(ks))
+    depth = ks[-1]
+    report: Dict[str, Dict[str, Any]] = {}
+    for mode, search in modes.items():
+        recalls: Dict[int, List[float]] = {k: [] for k in ks}
+        rrs: List[float] = []
+        latencies: List[float] = []
+        for item in golden:
+            start = time.perf_counter()
+            results = search(item, depth)
+            latencies.append((time.perf_counter() - start) * 1000.0)
+            for k in ks:
+                recalls[k].append(recall_at(results, item["expected"], k))
+            rrs.append(reciprocal_rank(results, item["expected"]))
+
+        n = len(golden) or 1
+        report[mode] = {
+            "queries": len(golden),
+            "recall": {f"@{k}": sum(recalls[k]) / n for k in ks},
+            "mrr": sum(rrs) / n,
+            "latency_ms": {
+                "p50": _percentile(latencies, 50),
+                "p90": _percentile(latencies, 90),
+                "p99": _percentile(latencies, 99),
+                "max": max(latencies, default=0.0),
+            },
+        }
+    return report
+
+
+def format_table(report: Dict[str, Dict[str, Any]]) -> str:
+    at_ks = list(next(iter(report.values()))["recall"]) if report else []
+    header = f"{'mode':<12}" + "".join(f" {'R' + at:>7}" for at in at_ks)
+    header += f" {'mrr':>7} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}"
+    lines = [header, "-" * len(header)]
+    for mode, row in report.items():
+        lat = row["latency_ms"]
+        line = f"{mode:<12}" + "".join(f" {row['recall'][at]:>7.4f}" for at in at_ks)
+        line += f" {row['mrr']:>7.4f} {lat['p50']:>9.3f} {lat['p90']:>9.3f} {lat['p99']:>9.3f}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def run_evaluation(
+    golden_path: Path | None = None,
+    ks: Sequence[int] = DEFAULT_KS,
+    chunks_path: Path | None = None,
+    emb_path: Path | None = None,
+    output_path: Path | None = None,
+    modes: Sequence[str] = MODES,
+) -> Dict[str, Dict[str, Any]]:
+    golden = load_golden_set(golden_path)
+    exact = load_index(chunks_path, emb_path)
+    quantized = load_index(chunks_path, emb_path, quantize="int8", keep_exact=False)
+    try:
+        available = build_modes(exact, quantized)
+        unknown = [m for m in modes if m not in available]
+        if unknown:
+            raise ValueError(f"Unknown retrieval modes: {unknown}; expected some of {list(available)}")
+
+        report = evaluate(golden, {m: available[m] for m in modes}, ks=ks)
+    finally:
+        # keep_exact=False holds the embeddings file open for rescoring.
+        quantized.close()
+
+    output_path = output_path or (OUTPUTS_DIR / "wiki_eval" / "retrieval_eval.json")
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps({"ks": sorted(set(ks)), "modes": report}, indent=2), encoding="utf-8")
+    return report
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare retrieval modes on a golden question set.")
+    parser.add_argument("--golden", type=Path, default=None, help="Golden set JSON (default: docs/retrieval_golden_set.json)")
+    parser.add_argument("-k", type=int, nargs="+", default=list(DEFAULT_KS), help="Cutoffs for recall@k")
+    parser.add_argument("--output", type=Path, default=None, help="JSON report path")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    args = parser.parse_args()
+
+    output_path = args.output or (OUTPUTS_DIR / "wiki_eval" / "retrieval_eval.json")
+    report = run_evaluation(golden_path=args.golden, ks=args.k, output_path=output_path, modes=args.modes)
+    print(format_table(report))
+    print(f"\nWrote JSON report to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""
+In-memory retrieval index over wiki chunks and their embeddings.
+
+The index is built once from `wiki_chunks.jsonl` + `wiki_embeddings.jsonl`
+and can be reused across queries. Alongside the vectors it precomputes one
+bitmap per (field, value) pair for the metadata fields in INDEXED_FIELDS, so
+metadata filters are resolved before any vector is scored.
+
+Bitmaps are plain Python ints: bit i is set when row i matches.
+
+A deduplicated chunk stands in for several source pages, so a field can
+hold several values for one row. Such a row passes the filters when at
+least one of its sources (the canonical chunk or a folded back-reference)
+passes all of them on its own, and ChunkIndex.source() names that source so
+results can be returned under its identity. Rows with mixed values are few,
+and these checks handle them individually.
+
+Optionally the vectors are also held as a QuantizedMatrix (int8/float16);
+with `keep_exact=False` the float lists are dropped entirely and exact rows
+are read back from disk only for rescoring.
+
+The section-level wiki link graph (rag/link_graph.py) is built alongside.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+
+from melvor_wiki_bot.config import OUTPUTS_DIR
+from melvor_wiki_bot.rag.link_graph import LinkGraph, build_link_graph
+from melvor_wiki_bot.rag.quantize import EmbeddingRowReader, QuantizedMatrix, iter_embedding_rows, quantize_vectors
+
+
+INDEXED_FIELDS = ("category", "page_id", "heading_level")
+
+Filter = Mapping[str, Iterable[Any]]
+
+
+def _load_chunks(chunks_path: Path) -> Dict[str, dict]:
+    chunks: Dict[str, dict] = {}
+    with chunks_path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            obj = json.loads(line)
+            chunks[obj["chunk_id"]] = obj
+    return chunks
+
+
+def _load_embeddings(emb_path: Path) -> Dict[str, List[float]]:
+    embs: Dict[str, List[float]] = {}
+    with emb_path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            obj = json.loads(line)
+            embs[obj["chunk_id"]] = obj["embedding"]
+    return embs
+
+
+def _field_values(chunk: dict, name: str) -> List[Any]:
+    meta = chunk.get("meta") or {}
+    if name == "category":
+        values = [meta.get("category")]
+    elif name == "heading_level":
+        return [chunk.get("heading_level", meta.get("heading_level"))]
+    else:
+        values = [chunk.get(name)]
+    # A deduplicated chunk also stands in for every page it was folded from.
+    for ref in meta.get("duplicates", ()):
+        if name in ref:
+            values.append(ref[name])
+    return values
+
+
+def _sources(chunk: dict) -> List[Dict[str, Any]]:
+    """
+    The canonical chunk's own identity followed by every folded back-reference.
+    """
+    meta = chunk.get("meta") or {}
+    own = {
+        "chunk_id": chunk.get("chunk_id"),
+        "page_id": chunk.get("page_id"),
+        "page_title": chunk.get("page_title"),
+        "url": chunk.get("url"),
+        "heading_id": chunk.get("heading_id"),
+        "heading_text": chunk.get("heading_text"),
+        "category": meta.get("category"),
+    }
+    return [own, *meta.get("duplicates", ())]
+
+
+def _as_values(values: Any) -> Iterable[Any]:
+    # A bare value means "this one value", not its characters.
+    if isinstance(values, (str, bytes)) or not isinstance(values, Iterable):
+        return (values,)
+    return values
+
+
+def _bits_to_rows(mask: int) -> List[int]:
+    # bin() is linear in the mask size; walking bits one at a time with
+    # `mask & -mask` would be quadratic on large corpora.
+    bits = bin(mask)[:1:-1]
+    return [i for i, b in enumerate(bits) if b == "1"]
+
+
+def _source_value(chunk: dict, source: Mapping[str, Any], name: str) -> Any:
+    if name == "heading_level":
+        # Back-references carry no level; folded sections share the canonical one.
+        return _field_values(chunk, name)[0]
+    return source.get(name)
+
+
+def _source_passes(chunk: dict, source: Mapping[str, Any], include: Filter | None, exclude: Filter | None) -> bool:
+    for name, values in (include or {}).items():
+        if _source_value(chunk, source, name) not in set(_as_values(values)):
+            return False
+    for name, values in (exclude or {}).items():
+        if _source_value(chunk, source, name) in set(_as_values(values)):
+            return False
+    return True
+
+
+@dataclass
+class ChunkIndex:
+    chunk_ids: List[str]
+    chunks: List[dict]
+    vectors: List[List[float]]
+    bitmaps: Dict[str, Dict[Any, int]] = field(default_factory=dict)
+    # field -> {row: all source values} for rows whose sources disagree.
+    mixed: Dict[str, Dict[int, frozenset]] = field(default_factory=dict)
+    quantized: QuantizedMatrix | None = None
+    exact_reader: EmbeddingRowReader | None = None
+    links: LinkGraph | None = None
+
+    def __len__(self) -> int:
+        return len(self.chunk_ids)
+
+    @property
+    def all_mask(self) -> int:
+        return (1 << len(self.chunk_ids)) - 1
+
+    def field_mask(self, name: str, values: Iterable[Any]) -> int:
+        if name not in self.bitmaps:
+            raise ValueError(f"Field {name!r} is not indexed; expected one of {sorted(self.bitmaps)}")
+        values = _as_values(values)
+        by_value = self.bitmaps[name]
+        mask = 0
+        for value in values:
+            mask |= by_value.get(value, 0)
+        return mask
+
+    def candidate_mask(
+        self,
+        include: Filter | None = None,
+        exclude: Filter | None = None,
+    ) -> int:
+        """
+        Combine field bitmaps into one candidate mask.
+
+        `include` maps field -> allowed values (values OR'ed within a field,
+        fields AND'ed together). `exclude` maps field -> rejected values; a
+        row with several source values is rejected only if all of them are.
+        """
+        mask = self.all_mask
+        for name, values in (include or {}).items():
+            mask &= self.field_mask(name, values)
+        for name, values in (exclude or {}).items():
+            mask &= ~self._exclude_mask(name, values)
+        mask &= self.all_mask
+
+        # A mixed row can pass field by field through different sources;
+        # keep it only if a single source passes every filter.
+        filtered = set(include or ()) | set(exclude or ())
+        for row in {row for name in filtered for row in self.mixed.get(name, {})}:
+            if mask >> row & 1 and self.source(row, include, exclude) is None:
+                mask &= ~(1 << row)
+        return mask
+
+    def _exclude_mask(self, name: str, values: Iterable[Any]) -> int:
+        values = set(_as_values(values))
+        mask = self.field_mask(name, values)
+        for row, row_values in self.mixed.get(name, {}).items():
+            if mask >> row & 1 and not row_values <= values:
+                mask &= ~(1 << row)
+        return mask
+
+    def source(
+        self,
+        row: int,
+        include: Filter | None = None,
+        exclude: Filter | None = None,
+    ) -> Dict[str, Any] | None:
+        """
+        Identity (chunk_id, page_id, page_title, url, heading_id,
+        heading_text, category) to present `row` under: the canonical chunk
+        if it passes the filters itself, else the first folded source that
+        does, else None.
+        """
+        chunk = self.chunks[row]
+        for src in _sources(chunk):
+            if _source_passes(chunk, src, include, exclude):
+                return src
+        return None
+
+    def candidates(
+        self,
+        include: Filter | None = None,
+        exclude: Filter | None = None,
+    ) -> List[int]:
+        if not include and not exclude:
+            return list(range(len(self.chunk_ids)))
+        return _bits_to_rows(self.candidate_mask(include, exclude))
+
+    def close(self) -> None:
+        if self.exact_reader is not None:
+            self.exact_reader.close()
+
+    def exact_vectors(self, rows: Iterable[int]) -> Dict[int, List[float]]:
+        rows = list(rows)
+        if self.vectors:
+            return {row: self.vectors[row] for row in rows}
+        if self.exact_reader is None:
+            raise RuntimeError("Index holds neither exact vectors nor an exact row reader")
+        by_cid = self.exact_reader.get(self.chunk_ids[row] for row in rows)
+        return {row: by_cid[self.chunk_ids[row]] for row in rows}
+
+
+def build_bitmaps(
+    chunks: List[dict],
+    fields: Iterable[str] = INDEXED_FIELDS,
+) -> Tuple[Dict[str, Dict[Any, int]], Dict[str, Dict[int, frozenset]]]:
+    """
+    Return (bitmaps, mixed): per-value bitmaps, plus the value sets of rows
+    that carry more than one distinct value for a field.
+    """
+    bitmaps: Dict[str, Dict[Any, int]] = {name: {} for name in fields}
+    mixed: Dict[str, Dict[int, frozenset]] = {name: {} for name in fields}
+    for row, chunk in enumerate(chunks):
+        bit = 1 << row
+        for name, by_value in bitmaps.items():
+            values = frozenset(_field_values(chunk, name))
+            for value in values:
+                by_value[value] = by_value.get(value, 0) | bit
+            if len(values) > 1:
+                mixed[name][row] = values
+    return bitmaps, mixed
+
+
+def build_index(chunks: Mapping[str, dict], embeddings: Mapping[str, List[float]]) -> ChunkIndex:
+    """
+    Build a ChunkIndex from loaded chunks and embeddings.
+
+    Rows follow embedding order; embeddings without a matching chunk are
+    dropped, as search_chunks has always done.
+    """
+    chunk_ids: List[str] = []
+    rows: List[dict] = []
+    vectors: List[List[float]] = []
+    for cid, vec in embeddings.items():
+        chunk = chunks.get(cid)
+        if not chunk:
+            continue
+        chunk_ids.append(cid)
+        rows.append(chunk)
+        vectors.append(vec)
+
+    bitmaps, mixed = build_bitmaps(rows)
+    return ChunkIndex(
+        chunk_ids=chunk_ids,
+        chunks=rows,
+        vectors=vectors,
+        bitmaps=bitmaps,
+        mixed=mixed,
+        links=build_link_graph(rows),
+    )
+
+
+def load_index(
+    chunks_path: Path | None = None,
+    emb_path: Path | None = None,
+    quantize: str | None = None,
+    keep_exact: bool = True,
+) -> ChunkIndex:
+    """
+    Load chunks + embeddings into a ChunkIndex.
+
+    `quantize` ("int8" or "float16") adds a QuantizedMatrix for first-stage
+    scoring. With `keep_exact=False` the full-precision vectors are streamed
+    straight into the quantized matrix and only their file offsets are kept.
+    """
+    chunks_path = chunks_path or (OUTPUTS_DIR / "wiki_chunks" / "wiki_chunks.jsonl")
+    emb_path = emb_path or (OUTPUTS_DIR / "wiki_chunks" / "wiki_embeddings.jsonl")
+    chunks = _load_chunks(chunks_path)
+
+    if quantize is None or keep_exact:
+        index = build_index(chunks, _load_embeddings(emb_path))
+        if quantize is not None:
+            index.quantized = quantize_vectors(index.vectors, quantize)
+        return index
+
+    # One handle for both passes and for later rescoring: the offsets stay
+    # valid even if the file is atomically replaced while the index lives.
+    f = emb_path.open("rb")
+    try:
+        # Deduplicate on chunk_id with last-row-wins, as _load_embeddings does.
+        offsets: Dict[str, int] = {}
+        for cid, _, offset in iter_embedding_rows(f):
+            if cid in chunks:
+                offsets[cid] = offset
+
+        chunk_ids: List[str] = []
+        rows: List[dict] = []
+        matrix: QuantizedMatrix | None = None
+        for cid, vec, offset in iter_embedding_rows(f):
+            if offsets.get(cid) != offset:
+                continue
+            if matrix is None:
+                matrix = QuantizedMatrix(quantize, len(vec))
+            matrix.append(vec)
+            chunk_ids.append(cid)
+            rows.append(chunks[cid])
+    except BaseException:
+        f.close()
+        raise
+
+    bitmaps, mixed = build_bitmaps(rows)
+    return ChunkIndex(
+        chunk_ids=chunk_ids,
+        chunks=rows,
+        vectors=[],
+        bitmaps=bitmaps,
+        mixed=mixed,
+        quantized=matrix or QuantizedMatrix(quantize, 0),
+        exact_reader=EmbeddingRowReader(f, offsets),
+        links=build_link_graph(rows),
+    )
@@ -0,0 +1,125 @@
+"""
+Compact chunk <-> page link graph in CSR form.
+
+Built from the `meta["links"]` titles the scraper records per section:
+
+  page_indptr / page_rows        page -> its chunk rows (section order, lead first)
+  row_page                       chunk row -> its page
+  link_indptr / link_pages       chunk row -> linked pages (outbound)
+  inbound_indptr / inbound_rows  page -> chunk rows linking to it
+
+All arrays are `array("i")`, so the graph stays a few bytes per edge and
+the neighbors of a row are one slice: expansion is O(degree).
+"""
+
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from melvor_wiki_bot.wiki.links import normalize_title, title_from_href
+
+
+@dataclass
+class LinkGraph:
+    page_ids: List[str]
+    page_indptr: array
+    page_rows: array
+    row_page: array
+    link_indptr: array
+    link_pages: array
+    inbound_indptr: array
+    inbound_rows: array
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.link_pages)
+
+    def page_chunks(self, page: int) -> Sequence[int]:
+        return self.page_rows[self.page_indptr[page] : self.page_indptr[page + 1]]
+
+    def linked_pages(self, row: int) -> Sequence[int]:
+        return self.link_pages[self.link_indptr[row] : self.link_indptr[row + 1]]
+
+    def linking_rows(self, page: int) -> Sequence[int]:
+        return self.inbound_rows[self.inbound_indptr[page] : self.inbound_indptr[page + 1]]
+
+    def neighbors(self, row: int, inbound: bool = False) -> List[int]:
+        """
+        Lead chunk of every page `row` links to; with `inbound`, also the
+        chunks whose sections link to `row`'s page.
+        """
+        out: List[int] = []
+        for page in self.linked_pages(row):
+            chunks = self.page_chunks(page)
+            if len(chunks):
+                out.append(chunks[0])
+        if inbound:
+            out.extend(self.linking_rows(self.row_page[row]))
+        return out
+
+
+def _csr(lists: Iterable[Iterable[int]]) -> Tuple[array, array]:
+    indptr = array("i", [0])
+    values = array("i")
+    for items in lists:
+        values.extend(items)
+        indptr.append(len(values))
+    return indptr, values
+
+
+def _page_titles(chunk: dict) -> List[str]:
+    titles = [chunk.get("page_title") or ""]
+    from_url = title_from_href(chunk.get("url"))
+    if from_url:
+        titles.append(from_url)
+    return [t for t in titles if t]
+
+
+def build_link_graph(chunks: Sequence[dict]) -> LinkGraph:
+    page_ids: List[str] = []
+    page_index: Dict[str, int] = {}
+    by_title: Dict[str, int] = {}
+    page_members: List[List[Tuple[int, int]]] = []
+
+    for row, chunk in enumerate(chunks):
+        pid = chunk["page_id"]
+        page = page_index.get(pid)
+        if page is None:
+            page = page_index[pid] = len(page_ids)
+            page_ids.append(pid)
+            page_members.append([])
+        section = (chunk.get("meta") or {}).get("section_index", row)
+        page_members[page].append((section, row))
+        for title in _page_titles(chunk):
+            by_title.setdefault(normalize_title(title), page)
+
+    row_page = array("i", (page_index[chunk["page_id"]] for chunk in chunks))
+    outbound: List[List[int]] = []
+    inbound: List[List[int]] = [[] for _ in page_ids]
+    for row, chunk in enumerate(chunks):
+        own = row_page[row]
+        targets: List[int] = []
+        for title in (chunk.get("meta") or {}).get("links", ()):
+            page = by_title.get(normalize_title(title))
+            if page is None or page == own or page in targets:
+                continue
+            targets.append(page)
+            inbound[page].append(row)
+        outbound.append(targets)
+
+    page_indptr, page_rows = _csr([row for _, row in sorted(members)] for members in page_members)
+    link_indptr, link_pages = _csr(outbound)
+    inbound_indptr, inbound_rows = _csr(inbound)
+
+    return LinkGraph(
+        page_ids=page_ids,
+        page_indptr=page_indptr,
+        page_rows=page_rows,
+        row_page=row_page,
+        link_indptr=link_indptr,
+        link_pages=link_pages,
+        inbound_indptr=inbound_indptr,
+        inbound_rows=inbound_rows,
+    )
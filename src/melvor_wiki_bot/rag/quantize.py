@@ -0,0 +1,183 @@
+"""
+Quantized embedding storage (int8 / float16) with exact rescoring support.
+
+Keeping every embedding as a Python list of floats costs far more than the
+vector payload itself. QuantizedMatrix stores each row as int8 or float16
+with a per-vector scale factor (max |x|), so search can run a cheap first
+pass on the compact matrix and rescore a short list with exact vectors.
+
+Exact vectors do not need to stay in memory: EmbeddingRowReader reads single
+rows back from `wiki_embeddings.jsonl` by byte offset, through the handle
+opened when the index was loaded.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import struct
+import threading
+from array import array
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+
+DTYPES = ("int8", "float16")
+
+
+class QuantizedMatrix:
+    def __init__(self, dtype: str, dim: int):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported dtype {dtype!r}; expected one of {DTYPES}")
+        self.dtype = dtype
+        self.dim = dim
+        self.data = array("b") if dtype == "int8" else bytearray()
+        self.scales = array("f")
+        self.norms = array("f")
+        self._f16 = struct.Struct(f"<{dim}e")
+
+    def __len__(self) -> int:
+        return len(self.scales)
+
+    @property
+    def nbytes(self) -> int:
+        data_bytes = len(self.data) * self.data.itemsize if isinstance(self.data, array) else len(self.data)
+        return data_bytes + len(self.scales) * self.scales.itemsize + len(self.norms) * self.norms.itemsize
+
+    def append(self, vec: Sequence[float]) -> None:
+        if len(vec) != self.dim:
+            raise ValueError(f"Expected vector of dim {self.dim}, got {len(vec)}")
+        scale = max((abs(x) for x in vec), default=0.0)
+        if scale == 0.0:
+            scaled = [0.0] * self.dim
+        else:
+            scaled = [x / scale for x in vec]
+
+        if self.dtype == "int8":
+            codes = [max(-127, min(127, round(x * 127))) for x in scaled]
+            self.data.extend(codes)
+            scale /= 127.0
+            stored = [c * scale for c in codes]
+        else:
+            packed = self._f16.pack(*scaled)
+            self.data.extend(packed)
+            stored = [x * scale for x in self._f16.unpack(packed)]
+
+        self.scales.append(scale)
+        self.norms.append(math.sqrt(sum(x * x for x in stored)))
+
+    def row_codes(self, row: int) -> Sequence[float]:
+        start = row * self.dim
+        if self.dtype == "int8":
+            return self.data[start : start + self.dim]
+        return self._f16.unpack_from(self.data, start * 2)
+
+    def row(self, row: int) -> List[float]:
+        scale = self.scales[row]
+        return [x * scale for x in self.row_codes(row)]
+
+    def cosine(self, row: int, q_vec: Sequence[float], q_norm: float) -> float:
+        norm = self.norms[row]
+        if norm == 0.0 or q_norm == 0.0 or len(q_vec) != self.dim:
+            return 0.0
+        dot = sum(x * y for x, y in zip(self.row_codes(row), q_vec))
+        return dot * self.scales[row] / (norm * q_norm)
+
+
+def quantize_vectors(vectors: Iterable[Sequence[float]], dtype: str = "int8") -> QuantizedMatrix:
+    matrix: QuantizedMatrix | None = None
+    for vec in vectors:
+        if matrix is None:
+            matrix = QuantizedMatrix(dtype, len(vec))
+        matrix.append(vec)
+    return matrix or QuantizedMatrix(dtype, 0)
+
+
+def iter_embedding_rows(f: BinaryIO) -> Iterator[Tuple[str, List[float], int]]:
+    """
+    Yield (chunk_id, embedding, byte_offset) for each row of an open
+    embeddings file, starting from the beginning.
+    """
+    f.seek(0)
+    while True:
+        offset = f.tell()
+        line = f.readline()
+        if not line:
+            break
+        line = line.strip()
+        if not line:
+            continue
+        obj = json.loads(line)
+        yield obj["chunk_id"], obj["embedding"], offset
+
+
+class EmbeddingRowReader:
+    """
+    Random access to full-precision rows of wiki_embeddings.jsonl.
+
+    Holds the file handle the offsets were recorded from. make_embeddings
+    and the pipeline replace the file with os.replace, so reopening it by
+    name could seek into a different file; the open handle keeps the
+    original inode alive instead.
+    """
+
+    def __init__(self, f: BinaryIO, offsets: Dict[str, int]):
+        self._f = f
+        self.offsets = offsets
+        self._lock = threading.Lock()
+
+    def get(self, chunk_ids: Iterable[str]) -> Dict[str, List[float]]:
+        out: Dict[str, List[float]] = {}
+        with self._lock:
+            for cid in sorted(chunk_ids, key=lambda c: self.offsets[c]):
+                self._f.seek(self.offsets[cid])
+                obj = json.loads(self._f.readline())
+                if obj.get("chunk_id") != cid:
+                    raise RuntimeError(
+                        f"Embedding row at offset {self.offsets[cid]} is {obj.get('chunk_id')!r}, expected {cid!r}"
+                    )
+                out[cid] = obj["embedding"]
+        return out
+
+    def close(self) -> None:
+        self._f.close()
+
+
+def exact_payload_bytes(num_rows: int, dim: int) -> int:
+    # float64 payload only; Python list/float object overhead is extra.
+    return num_rows * dim * 8
+
+
+def main() -> None:
+    from melvor_wiki_bot.rag.index import load_index
+    from melvor_wiki_bot.rag.retrieval import search_chunks
+
+    exact = load_index()
+    queries = []
+    for chunk in exact.chunks[:200]:
+        heading = chunk.get("heading_text") or ""
+        queries.append(f"{chunk['page_title']} {heading}".strip())
+
+    top_k = 5
+    baseline = {q: [r.chunk_id for r in search_chunks(q, top_k=top_k, index=exact)] for q in queries}
+    dim = len(exact.vectors[0]) if exact.vectors else 0
+    print(f"Rows: {len(exact)}  dim: {dim}  queries: {len(queries)}  k: {top_k}")
+    print(f"exact float64 payload: {exact_payload_bytes(len(exact), dim)} bytes")
+
+    for dtype in DTYPES:
+        index = load_index(quantize=dtype, keep_exact=False)
+        for rescore in (False, True):
+            hits = 0
+            total = 0
+            for q in queries:
+                got = {r.chunk_id for r in search_chunks(q, top_k=top_k, index=index, rescore=rescore)}
+                expected = baseline[q]
+                hits += sum(1 for cid in expected if cid in got)
+                total += len(expected)
+            recall = hits / total if total else 1.0
+            label = "rescored" if rescore else "quantized only"
+            print(f"{dtype:>8} {label:<15} recall@{top_k}={recall:.4f}  payload: {index.quantized.nbytes} bytes")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Second-stage reranker for the retrieval cascade.
+
+The first stage (cosine over the index) pulls a wide candidate list; this
+module rescores only those candidates with cheap structural signals the
+embedding ignores:
+
+  - query term matches in the page title and section heading
+  - section proximity: sections close to other strong hits on the same page
+  - per-category page priors (e.g. demote `meta` pages)
+
+Candidates are processed in first-stage order, so when the latency budget
+runs out the remaining ones simply keep their (weighted) first-stage score.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence, Set, Tuple
+
+
+_WORD_RE = re.compile(r"\w+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by do does for from how i in is it of on or the to what when where which who why with".split()
+)
+
+
+def tokenize(text: str | None) -> Set[str]:
+    if not text:
+        return set()
+    return {w for w in _WORD_RE.findall(text.lower()) if w not in STOPWORDS}
+
+
+@dataclass
+class RerankConfig:
+    vector_weight: float = 1.0
+    title_weight: float = 0.3
+    heading_weight: float = 0.2
+    proximity_weight: float = 0.1
+    category_priors: Dict[str, float] = field(
+        default_factory=lambda: {"meta": -0.15, "guide_index": -0.05}
+    )
+    budget_ms: float | None = None
+
+
+def _overlap(query_terms: Set[str], terms: Set[str]) -> float:
+    if not query_terms or not terms:
+        return 0.0
+    return len(query_terms & terms) / len(query_terms)
+
+
+def _chunk_titles(chunk: dict) -> Tuple[Set[str], Set[str]]:
+    # Only the canonical chunk's own title and heading count. Pages folded in
+    # as near-duplicates are mostly shared boilerplate (navboxes, footers);
+    # crediting their titles would promote exactly those chunks.
+    return tokenize(chunk.get("page_title")), tokenize(chunk.get("heading_text"))
+
+
+def rerank(
+    query: str,
+    candidates: Sequence[Tuple[dict, float]],
+    config: RerankConfig | None = None,
+) -> List[Tuple[int, float]]:
+    """
+    Rescore first-stage candidates.
+
+    `candidates` is (chunk, first_stage_score) in first-stage order. Returns
+    (position in `candidates`, new score) sorted best first.
+    """
+    config = config or RerankConfig()
+    deadline = None
+    if config.budget_ms is not None:
+        deadline = time.perf_counter() + config.budget_ms / 1000.0
+
+    query_terms = tokenize(query)
+
+    # Sections already seen per page, for the proximity signal. Filled in
+    # first-stage order so each candidate only looks at stronger hits.
+    seen_sections: Dict[str, List[int]] = {}
+
+    scored: List[Tuple[int, float]] = []
+    for pos, (chunk, base) in enumerate(candidates):
+        if deadline is not None and time.perf_counter() > deadline:
+            scored.extend((rest, config.vector_weight * candidates[rest][1]) for rest in range(pos, len(candidates)))
+            break
+
+        meta = chunk.get("meta") or {}
+        title_terms, heading_terms = _chunk_titles(chunk)
+        score = config.vector_weight * base
+        score += config.title_weight * _overlap(query_terms, title_terms)
+        score += config.heading_weight * _overlap(query_terms, heading_terms)
+        score += config.category_priors.get(meta.get("category"), 0.0)
+
+        section = meta.get("section_index")
+        page_sections = seen_sections.setdefault(chunk.get("page_id"), [])
+        if section is not None:
+            if page_sections:
+                distance = min(abs(section - other) for other in page_sections)
+                score += config.proximity_weight / (1 + distance)
+            page_sections.append(section)
+
+        scored.append((pos, score))
+
+    scored.sort(key=lambda x: x[1], reverse=True)
+    return scored
@@ -1,13 +1,14 @@
 from __future__ import annotations
 
-import json
 import math
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Any, Dict, List, Tuple
 
-from melvor_wiki_bot.config import OUTPUTS_DIR
 from melvor_wiki_bot.rag.embeddings import embed_texts
+from melvor_wiki_bot.rag.index import ChunkIndex, Filter, load_index
+from melvor_wiki_bot.rag.rerank import RerankConfig, rerank
+from melvor_wiki_bot.rag.snapshots import default_store, load_snapshot_index
 
 
 @dataclass
@@ -19,30 +20,10 @@ class RetrievalResult:
     heading_text: str | None
     text: str
     url: str
-
-
-def _load_chunks(chunks_path: Path) -> Dict[str, dict]:
-    chunks: Dict[str, dict] = {}
-    with chunks_path.open("r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            obj = json.loads(line)
-            chunks[obj["chunk_id"]] = obj
-    return chunks
-
-
-def _load_embeddings(emb_path: Path) -> Dict[str, List[float]]:
-    embs: Dict[str, List[float]] = {}
-    with emb_path.open("r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            obj = json.loads(line)
-            embs[obj["chunk_id"]] = obj["embedding"]
-    return embs
+    heading_id: str | None = None
+    category: str | None = None
+    duplicates: List[Dict[str, Any]] = field(default_factory=list)
+    linked_from: str | None = None
 
 
 def _cosine(a: List[float], b: List[float]) -> float:
@@ -56,46 +37,178 @@ def _cosine(a: List[float], b: List[float]) -> float:
     return dot / (na * nb)
 
 
+def _to_result(
+    index: ChunkIndex,
+    row: int,
+    score: float,
+    linked_from: str | None = None,
+    include: Filter | None = None,
+    exclude: Filter | None = None,
+) -> RetrievalResult:
+    chunk = index.chunks[row]
+    # A folded row that passed the filters only through one of its sources
+    # is reported as that source, so results never contradict the filters.
+    source = index.source(row, include, exclude)
+    return RetrievalResult(
+        chunk_id=source["chunk_id"],
+        score=score,
+        page_id=source["page_id"],
+        page_title=source["page_title"],
+        heading_text=source.get("heading_text"),
+        text=chunk["text"],
+        url=source["url"],
+        heading_id=source.get("heading_id"),
+        category=source.get("category"),
+        duplicates=list((chunk.get("meta") or {}).get("duplicates", ())),
+        linked_from=linked_from,
+    )
+
+
+def _with_link_neighbors(
+    index: ChunkIndex,
+    scored: List[Tuple[int, float]],
+    per_hit: int,
+    include: Filter | None = None,
+    exclude: Filter | None = None,
+) -> List[RetrievalResult]:
+    """
+    Results for `scored`, each followed by up to `per_hit` chunks from the
+    pages it links to (lead sections, via the CSR link graph). Neighbors
+    inherit the hit's score and name it in `linked_from`; neighbors the
+    `include` / `exclude` filters reject are skipped.
+    """
+    results: List[RetrievalResult] = []
+    seen = {row for row, _ in scored}
+    allowed = index.candidate_mask(include, exclude) if per_hit > 0 else 0
+    for row, score in scored:
+        hit = _to_result(index, row, score, include=include, exclude=exclude)
+        results.append(hit)
+        if per_hit <= 0 or index.links is None:
+            continue
+        added = 0
+        for neighbor in index.links.neighbors(row):
+            if added >= per_hit:
+                break
+            if neighbor in seen or not allowed >> neighbor & 1:
+                continue
+            seen.add(neighbor)
+            results.append(_to_result(index, neighbor, score, hit.chunk_id, include, exclude))
+            added += 1
+    return results
+
+
+def _rank_rows(
+    q_vec: List[float],
+    index: ChunkIndex,
+    top_k: int,
+    include: Filter | None = None,
+    exclude: Filter | None = None,
+    rescore: bool = True,
+    shortlist_size: int | None = None,
+) -> List[Tuple[int, float]]:
+    rows = index.candidates(include, exclude)
+
+    scored: List[Tuple[int, float]] = []
+    if index.quantized is None:
+        for row in rows:
+            score = _cosine(q_vec, index.vectors[row])
+            scored.append((row, score))
+    else:
+        q_norm = math.sqrt(sum(x * x for x in q_vec))
+        for row in rows:
+            scored.append((row, index.quantized.cosine(row, q_vec, q_norm)))
+        if rescore:
+            scored.sort(key=lambda x: x[1], reverse=True)
+            shortlist = [row for row, _ in scored[: shortlist_size or 4 * top_k]]
+            exact = index.exact_vectors(shortlist)
+            scored = [(row, _cosine(q_vec, exact[row])) for row in shortlist]
+
+    scored.sort(key=lambda x: x[1], reverse=True)
+    return scored[:top_k]
+
+
+def _resolve_index(
+    index: ChunkIndex | None,
+    chunks_path: Path | None,
+    emb_path: Path | None,
+    snapshot: str | None,
+) -> ChunkIndex:
+    if index is not None:
+        return index
+    if snapshot is not None:
+        return load_snapshot_index(snapshot)
+    return load_index(chunks_path, emb_path)
+
+
 def search_chunks(
     query: str,
     top_k: int = 5,
     chunks_path: Path | None = None,
     emb_path: Path | None = None,
+    index: ChunkIndex | None = None,
+    include: Filter | None = None,
+    exclude: Filter | None = None,
+    rescore: bool = True,
+    shortlist_size: int | None = None,
+    snapshot: str | None = None,
+    expand_links: int = 0,
 ) -> List[RetrievalResult]:
-    chunks_path = chunks_path or (OUTPUTS_DIR / "wiki_chunks" / "wiki_chunks.jsonl")
-    emb_path = emb_path or (OUTPUTS_DIR / "wiki_chunks" / "wiki_embeddings.jsonl")
+    """
+    Cosine search over the chunk embeddings.
+
+    Pass a prebuilt `index` to avoid reloading the JSONL files per query.
+    `include` / `exclude` filter on the index's metadata bitmaps before any
+    vector is scored, e.g.:
+
+        search_chunks(q, include={"category": {"combat_skill", "combat_guide"}})
+        search_chunks(q, exclude={"category": {"meta"}})
+
+    If the index carries a quantized matrix, candidates are first scored on
+    it and the best `shortlist_size` (default 4 * top_k) are rescored with
+    exact vectors; `rescore=False` returns the quantized ordering as-is.
 
-    chunks = _load_chunks(chunks_path)
-    embs = _load_embeddings(emb_path)
+    `snapshot` searches a named index snapshot instead of the JSONL files.
+
+    `expand_links` > 0 appends, after each hit, up to that many chunks from
+    wiki pages the hit's section links to (marked with `linked_from`),
+    subject to the same filters.
+    """
+    index = _resolve_index(index, chunks_path, emb_path, snapshot)
 
     # embed query using the same function used for chunks
     [q_vec] = embed_texts([query])
 
-    scored: List[Tuple[str, float]] = []
-    for cid, vec in embs.items():
-        score = _cosine(q_vec, vec)
-        scored.append((cid, score))
+    scored = _rank_rows(q_vec, index, top_k, include, exclude, rescore, shortlist_size)
+    return _with_link_neighbors(index, scored, expand_links, include, exclude)
 
-    scored.sort(key=lambda x: x[1], reverse=True)
-    scored = scored[:top_k]
 
-    results: List[RetrievalResult] = []
-    for cid, score in scored:
-        chunk = chunks.get(cid)
-        if not chunk:
-            continue
-        results.append(
-            RetrievalResult(
-                chunk_id=cid,
-                score=score,
-                page_id=chunk["page_id"],
-                page_title=chunk["page_title"],
-                heading_text=chunk.get("heading_text"),
-                text=chunk["text"],
-                url=chunk["url"],
-            )
-        )
-    return results
+def search_cascade(
+    query: str,
+    top_k: int = 5,
+    num_candidates: int = 50,
+    config: RerankConfig | None = None,
+    chunks_path: Path | None = None,
+    emb_path: Path | None = None,
+    index: ChunkIndex | None = None,
+    include: Filter | None = None,
+    exclude: Filter | None = None,
+    snapshot: str | None = None,
+    expand_links: int = 0,
+) -> List[RetrievalResult]:
+    """
+    Two-stage retrieval: cosine pulls `num_candidates`, then the heading-aware
+    reranker (rag/rerank.py) rescores only those and the best `top_k` are
+    returned. Set `config.budget_ms` to cap reranking time per query.
+    `expand_links` works as in search_chunks.
+    """
+    index = _resolve_index(index, chunks_path, emb_path, snapshot)
+
+    [q_vec] = embed_texts([query])
+    first = _rank_rows(q_vec, index, max(num_candidates, top_k), include, exclude)
+
+    reranked = rerank(query, [(index.chunks[row], score) for row, score in first], config)
+    top = [(first[pos][0], score) for pos, score in reranked[:top_k]]
+    return _with_link_neighbors(index, top, expand_links, include, exclude)
 
 
 def main() -> None:
@@ -106,7 +219,9 @@ def main() -> None:
     else:
         query = input("Enter query: ").strip()
 
-    results = search_chunks(query, top_k=5)
+    # Serve the promoted snapshot when there is one, else the working files.
+    snapshot = default_store().current()
+    results = search_cascade(query, top_k=5, snapshot=snapshot)
     print(f"Top {len(results)} results for: {query!r}\n")
     for i, r in enumerate(results, start=1):
         heading = f" — {r.heading_text}" if r.heading_text else ""
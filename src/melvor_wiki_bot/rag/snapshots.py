@@ -0,0 +1,328 @@
+"""
+Named, immutable index snapshots with content-addressed storage.
+
+Layout under `outputs/wiki_index/`:
+
+    objects/chunks/<hash>.json    one chunk record, keyed by its content hash
+    objects/vectors/<hash>.json   one embedding, keyed by (embedding model, text)
+    objects/aux/<hash>.json       auxiliary index payloads
+    snapshots/<name>.json         ordered (chunk hash, vector hash) pairs + aux hashes
+    CURRENT                       name of the snapshot the retrieval path serves
+
+Snapshots built from different wiki revisions share every unchanged chunk
+and vector object on disk, and SnapshotStore shares them in memory too, so
+serving the current patch while building (or querying) another costs only
+the changed sections. Vectors are reused by text hash, so only new or edited
+sections are embedded when a snapshot is created.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from melvor_wiki_bot.config import OUTPUTS_DIR
+from melvor_wiki_bot.fileio import atomic_write_text
+from melvor_wiki_bot.rag.embeddings import EMBEDDING_MODEL, embed_texts, text_key
+from melvor_wiki_bot.rag.index import ChunkIndex, _load_chunks, build_index
+from melvor_wiki_bot.rag.quantize import quantize_vectors
+
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+
+
+def _canonical_json(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def content_hash(obj: Any) -> str:
+    return hashlib.sha256(_canonical_json(obj).encode("utf-8")).hexdigest()
+
+
+def vector_key(text: str, model: str = EMBEDDING_MODEL) -> str:
+    return text_key(text, model)
+
+
+def load_keyed_embeddings(emb_path: Path) -> Dict[str, Tuple[Optional[str], List[float]]]:
+    """
+    chunk_id -> (text_key, embedding) from wiki_embeddings.jsonl. Rows
+    written before text keys existed get None and are never trusted.
+    """
+    embs: Dict[str, Tuple[Optional[str], List[float]]] = {}
+    with emb_path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            obj = json.loads(line)
+            embs[obj["chunk_id"]] = (obj.get("text_key"), obj["embedding"])
+    return embs
+
+
+class SnapshotStore:
+    def __init__(self, root: Path | None = None):
+        self.root = root or (OUTPUTS_DIR / "wiki_index")
+        self.objects_dir = self.root / "objects"
+        self.snapshots_dir = self.root / "snapshots"
+        self.current_path = self.root / "CURRENT"
+        # Loaded objects by hash: every snapshot held in memory references
+        # the same dict/list for an unchanged chunk or vector. `_rows` keeps
+        # the (chunk, vector) keys of each loaded snapshot so evict() can
+        # release objects no remaining snapshot uses.
+        self._chunks: Dict[str, dict] = {}
+        self._vectors: Dict[str, List[float]] = {}
+        self._indexes: Dict[Tuple[str, str | None], ChunkIndex] = {}
+        self._rows: Dict[str, List[List[str]]] = {}
+        self._lock = threading.Lock()
+
+    # -- objects -----------------------------------------------------------
+
+    def _object_path(self, kind: str, key: str) -> Path:
+        return self.objects_dir / kind / key[:2] / f"{key}.json"
+
+    def _put_object(self, kind: str, key: str, payload: Any) -> None:
+        path = self._object_path(kind, key)
+        if path.exists():
+            return
+        atomic_write_text(path, _canonical_json(payload))
+
+    def _get_object(self, kind: str, key: str) -> Any:
+        with self._object_path(kind, key).open("r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def has_vector(self, key: str) -> bool:
+        return key in self._vectors or self._object_path("vectors", key).exists()
+
+    def get_chunk(self, key: str) -> dict:
+        chunk = self._chunks.get(key)
+        if chunk is None:
+            chunk = self._chunks[key] = self._get_object("chunks", key)
+        return chunk
+
+    def get_vector(self, key: str) -> List[float]:
+        vec = self._vectors.get(key)
+        if vec is None:
+            vec = self._vectors[key] = self._get_object("vectors", key)["embedding"]
+        return vec
+
+    def get_aux(self, name: str, snapshot: str | None = None) -> Any:
+        manifest = self.read_manifest(snapshot)
+        key = manifest.get("aux", {}).get(name)
+        if key is None:
+            return None
+        return self._get_object("aux", key)
+
+    # -- snapshots ---------------------------------------------------------
+
+    def _manifest_path(self, name: str) -> Path:
+        if not _NAME_RE.match(name):
+            raise ValueError(f"Invalid snapshot name: {name!r}")
+        return self.snapshots_dir / f"{name}.json"
+
+    def list_snapshots(self) -> List[str]:
+        if not self.snapshots_dir.exists():
+            return []
+        return sorted(p.stem for p in self.snapshots_dir.glob("*.json"))
+
+    def current(self) -> str | None:
+        if not self.current_path.exists():
+            return None
+        name = self.current_path.read_text(encoding="utf-8").strip()
+        return name or None
+
+    def read_manifest(self, name: str | None = None) -> Dict[str, Any]:
+        name = name or self.current()
+        if name is None:
+            raise FileNotFoundError(f"No snapshot promoted under {self.root}")
+        with self._manifest_path(name).open("r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def create(
+        self,
+        name: str,
+        chunks: List[dict],
+        embeddings: Mapping[str, Tuple[Optional[str], List[float]]] | None = None,
+        aux: Mapping[str, Any] | None = None,
+    ) -> Path:
+        """
+        Write a new immutable snapshot.
+
+        Chunk vectors are looked up by text hash first. `embeddings`
+        (chunk_id -> (text_key, vector)) fills the rest, but only where the
+        row's text_key matches the chunk's current text, so a stale
+        embeddings file can never be stored under a new text's hash.
+        Anything still missing is embedded with embed_texts. Existing
+        snapshots are never overwritten.
+        """
+        manifest_path = self._manifest_path(name)
+        if manifest_path.exists():
+            raise FileExistsError(f"Snapshot {name!r} already exists; snapshots are immutable")
+
+        embeddings = embeddings or {}
+        vector_keys = [vector_key(c.get("text", "")) for c in chunks]
+
+        missing: Dict[str, str] = {}
+        for chunk, vkey in zip(chunks, vector_keys):
+            if self.has_vector(vkey):
+                continue
+            supplied = embeddings.get(chunk["chunk_id"])
+            if supplied is not None and supplied[0] == vkey:
+                self._put_object("vectors", vkey, {"embedding": supplied[1]})
+            else:
+                missing.setdefault(vkey, chunk.get("text", ""))
+
+        if missing:
+            vectors = embed_texts(list(missing.values()))
+            if len(vectors) != len(missing):
+                raise RuntimeError("embed_texts returned mismatched vector count")
+            for vkey, vec in zip(missing, vectors):
+                self._put_object("vectors", vkey, {"embedding": vec})
+
+        rows: List[List[str]] = []
+        for chunk, vkey in zip(chunks, vector_keys):
+            ckey = content_hash(chunk)
+            self._put_object("chunks", ckey, chunk)
+            rows.append([ckey, vkey])
+
+        aux_keys: Dict[str, str] = {}
+        for aux_name, payload in (aux or {}).items():
+            akey = content_hash(payload)
+            self._put_object("aux", akey, payload)
+            aux_keys[aux_name] = akey
+
+        manifest = {
+            "name": name,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "embedding_model": EMBEDDING_MODEL,
+            "rows": rows,
+            "aux": aux_keys,
+        }
+        # Re-check right before publishing; os.replace would clobber.
+        if manifest_path.exists():
+            raise FileExistsError(f"Snapshot {name!r} already exists; snapshots are immutable")
+        atomic_write_text(manifest_path, json.dumps(manifest, ensure_ascii=False))
+        return manifest_path
+
+    def create_from_files(
+        self,
+        name: str,
+        chunks_path: Path | None = None,
+        emb_path: Path | None = None,
+        aux: Mapping[str, Any] | None = None,
+    ) -> Path:
+        chunks_path = chunks_path or (OUTPUTS_DIR / "wiki_chunks" / "wiki_chunks.jsonl")
+        chunks = list(_load_chunks(chunks_path).values())
+        embeddings = load_keyed_embeddings(emb_path) if emb_path is not None and emb_path.exists() else None
+        return self.create(name, chunks, embeddings=embeddings, aux=aux)
+
+    def promote(self, name: str) -> None:
+        """
+        Atomically switch the retrieval path to snapshot `name`.
+        """
+        if not self._manifest_path(name).exists():
+            raise FileNotFoundError(f"Unknown snapshot: {name!r}")
+        atomic_write_text(self.current_path, name + "\n")
+
+    def load_index(self, name: str | None = None, quantize: str | None = None) -> ChunkIndex:
+        """
+        Load (or reuse) the ChunkIndex for a snapshot; defaults to CURRENT.
+
+        Re-reading CURRENT on every call is cheap, so a long-running process
+        picks up a promote on its next query.
+        """
+        name = name or self.current()
+        if name is None:
+            raise FileNotFoundError(f"No snapshot promoted under {self.root}")
+
+        with self._lock:
+            cached = self._indexes.get((name, quantize))
+            if cached is not None:
+                return cached
+
+            manifest = self.read_manifest(name)
+            chunks: Dict[str, dict] = {}
+            embeddings: Dict[str, List[float]] = {}
+            for ckey, vkey in manifest["rows"]:
+                chunk = self.get_chunk(ckey)
+                chunks[chunk["chunk_id"]] = chunk
+                embeddings[chunk["chunk_id"]] = self.get_vector(vkey)
+
+            index = build_index(chunks, embeddings)
+            if quantize is not None:
+                index.quantized = quantize_vectors(index.vectors, quantize)
+            self._indexes[(name, quantize)] = index
+            self._rows[name] = manifest["rows"]
+            return index
+
+    def evict(self, name: str) -> None:
+        """
+        Drop a snapshot's indexes, and every cached chunk or vector that no
+        other loaded snapshot still references.
+        """
+        with self._lock:
+            for key in [k for k in self._indexes if k[0] == name]:
+                del self._indexes[key]
+            self._rows.pop(name, None)
+
+            live_chunks = {ckey for rows in self._rows.values() for ckey, _ in rows}
+            live_vectors = {vkey for rows in self._rows.values() for _, vkey in rows}
+            self._chunks = {k: v for k, v in self._chunks.items() if k in live_chunks}
+            self._vectors = {k: v for k, v in self._vectors.items() if k in live_vectors}
+
+
+_default_store: SnapshotStore | None = None
+
+
+def default_store() -> SnapshotStore:
+    global _default_store
+    if _default_store is None:
+        _default_store = SnapshotStore()
+    return _default_store
+
+
+def load_snapshot_index(name: str | None = None, quantize: str | None = None) -> ChunkIndex:
+    return default_store().load_index(name, quantize=quantize)
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage versioned wiki index snapshots.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    create = sub.add_parser("create", help="Snapshot the current wiki_chunks/wiki_embeddings files.")
+    create.add_argument("name")
+    create.add_argument("--promote", action="store_true")
+
+    promote = sub.add_parser("promote", help="Point the retrieval path at a snapshot.")
+    promote.add_argument("name")
+
+    sub.add_parser("list", help="List snapshots.")
+
+    args = parser.parse_args()
+    store = default_store()
+
+    if args.command == "create":
+        emb_path = OUTPUTS_DIR / "wiki_chunks" / "wiki_embeddings.jsonl"
+        path = store.create_from_files(args.name, emb_path=emb_path)
+        print(f"Wrote snapshot {args.name!r} to {path}")
+        if args.promote:
+            store.promote(args.name)
+            print(f"Promoted {args.name!r}")
+    elif args.command == "promote":
+        store.promote(args.name)
+        print(f"Promoted {args.name!r}")
+    else:
+        current = store.current()
+        for name in store.list_snapshots():
+            marker = "*" if name == current else " "
+            print(f"{marker} {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Persistent per-page job journal for resumable scraping.
+
+The journal is an append-only JSONL file: every state change appends one
+line, and loading replays the lines so the last entry per page wins. A crash
+can at worst lose the line being written, never corrupt earlier pages.
+
+A page is marked pending when its fetch starts, so a page interrupted by a
+crash replays as pending; `attempts` counts HTTP requests across all runs
+and is persisted with each state change.
+
+Each entry records the URL it was fetched from. The manifest pins pages to
+an `oldid` revision, so a page only counts as done for the URL it was
+fetched from; bumping the revision makes it pending again.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional
+
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+@dataclass
+class JobState:
+    page_id: str
+    url: Optional[str] = None
+    state: str = PENDING
+    attempts: int = 0
+    error: Optional[str] = None
+    updated_at: Optional[str] = None
+
+
+class ScrapeJournal:
+    def __init__(self, path: Path):
+        self.path = path
+        self.jobs: Dict[str, JobState] = {}
+        if path.exists():
+            self._replay()
+
+    def _replay(self) -> None:
+        with self.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    obj = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn final line from an interrupted run.
+                    continue
+                self.jobs[obj["page_id"]] = JobState(**obj)
+
+    def _append(self, job: JobState) -> None:
+        job.updated_at = datetime.now(timezone.utc).isoformat()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(asdict(job), ensure_ascii=False) + "\n")
+            f.flush()
+
+    def reset(self) -> None:
+        self.jobs = {}
+        if self.path.exists():
+            self.path.unlink()
+
+    def get(self, page_id: str) -> JobState:
+        job = self.jobs.get(page_id)
+        if job is None:
+            job = self.jobs[page_id] = JobState(page_id=page_id)
+        return job
+
+    def is_done(self, page_id: str, url: str) -> bool:
+        job = self.get(page_id)
+        return job.state == DONE and job.url == url
+
+    def pending(self, urls: Mapping[str, str]) -> List[str]:
+        """
+        Page ids (in the given order of the page_id -> url mapping) that are
+        not done yet for their current URL.
+        """
+        return [pid for pid, url in urls.items() if not self.is_done(pid, url)]
+
+    def mark_pending(self, page_id: str, url: str) -> None:
+        job = self.get(page_id)
+        job.url = url
+        job.state = PENDING
+        self._append(job)
+
+    def count_attempt(self, page_id: str) -> None:
+        # In memory only; the next state change writes the running total.
+        self.get(page_id).attempts += 1
+
+    def mark_done(self, page_id: str, url: str) -> None:
+        job = self.get(page_id)
+        job.url = url
+        job.state = DONE
+        job.error = None
+        self._append(job)
+
+    def mark_failed(self, page_id: str, url: str, error: str) -> None:
+        job = self.get(page_id)
+        job.url = url
+        job.state = FAILED
+        job.error = error
+        self._append(job)
+
+    def counts(self) -> Dict[str, int]:
+        out = {PENDING: 0, DONE: 0, FAILED: 0}
+        for job in self.jobs.values():
+            out[job.state] = out.get(job.state, 0) + 1
+        return out
@@ -0,0 +1,40 @@
+"""
+Helpers for internal wiki links (`/w/Title`, `/index.php?title=Title`).
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+from urllib.parse import parse_qs, unquote, urlparse
+
+
+WIKI_HOST = "wiki.melvoridle.com"
+
+
+def title_from_href(href: str | None) -> Optional[str]:
+    """
+    Return the article title an internal link points to, or None for
+    external links, non-article namespaces (File:, Category:, ...) and
+    same-page anchors.
+    """
+    if not href:
+        return None
+    parsed = urlparse(href)
+    if parsed.netloc and parsed.netloc != WIKI_HOST:
+        return None
+
+    title: Optional[str] = None
+    if parsed.path.startswith("/w/"):
+        title = unquote(parsed.path[len("/w/"):])
+    elif parsed.path.endswith("/index.php"):
+        values = parse_qs(parsed.query).get("title")
+        title = values[0] if values else None
+
+    if not title or ":" in title:
+        return None
+    title = title.replace("_", " ").strip()
+    return title or None
+
+
+def normalize_title(title: str) -> str:
+    return " ".join(title.replace("_", " ").split()).casefold()
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Optional
 
 
@@ -9,6 +9,7 @@ class WikiSection:
     heading_text: Optional[str]
     html: str
     plain_text: str
+    links: List[str] = field(default_factory=list)
 
 
 @dataclass
@@ -1,25 +1,97 @@
 from __future__ import annotations
 
 import json
-from dataclasses import asdict
+import logging
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, FrozenSet, List, Optional
 
 import requests
 from bs4 import BeautifulSoup, Tag
 
 from melvor_wiki_bot.config import OUTPUTS_DIR
+from melvor_wiki_bot.fileio import atomic_write_text
+from melvor_wiki_bot.wiki.journal import ScrapeJournal
+from melvor_wiki_bot.wiki.links import title_from_href
 from melvor_wiki_bot.wiki.manifest import WikiManifestEntry, load_manifest
 from melvor_wiki_bot.wiki.models import WikiPageStructured, WikiSection, WikiTable
 
 
-def _fetch_html(url: str) -> str:
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 5
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+    retry_statuses: FrozenSet[int] = frozenset({429, 500, 502, 503, 504})
+
+    def backoff(self, attempt: int) -> float:
+        return min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+
+
+def _retry_after_seconds(value: str | None) -> float | None:
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def _fetch_html(
+    url: str,
+    policy: RetryPolicy | None = None,
+    sleep: Callable[[float], None] = time.sleep,
+    on_attempt: Callable[[], None] | None = None,
+) -> str:
+    """
+    GET a page, retrying timeouts, connection errors and retryable statuses
+    with exponential backoff. `on_attempt` is called before every request. A Retry-After header overrides the computed
+    delay; when it asks for longer than policy.max_delay the response's
+    error is raised at once, so the caller gives up on the page for this
+    run instead of retrying before the server allows it.
+    """
+    policy = policy or RetryPolicy()
     headers = {
         "User-Agent": "melvor-wiki-bot/0.1 (full scraper)"
     }
-    resp = requests.get(url, headers=headers, timeout=20)
-    resp.raise_for_status()
-    return resp.text
+
+    attempt = 0
+    while True:
+        attempt += 1
+        retry_after: float | None = None
+        if on_attempt is not None:
+            on_attempt()
+        try:
+            resp = requests.get(url, headers=headers, timeout=20)
+        except (requests.Timeout, requests.ConnectionError) as e:
+            if attempt >= policy.max_attempts:
+                raise
+            logger.warning("Fetch %s failed (%s); attempt %d/%d", url, e, attempt, policy.max_attempts)
+        else:
+            if resp.status_code not in policy.retry_statuses or attempt >= policy.max_attempts:
+                resp.raise_for_status()
+                return resp.text
+            retry_after = _retry_after_seconds(resp.headers.get("Retry-After"))
+            if retry_after is not None and retry_after > policy.max_delay:
+                logger.warning(
+                    "Fetch %s returned %d with Retry-After %.0fs; not retrying", url, resp.status_code, retry_after
+                )
+                resp.raise_for_status()
+            logger.warning("Fetch %s returned %d; attempt %d/%d", url, resp.status_code, attempt, policy.max_attempts)
+
+        sleep(retry_after if retry_after is not None else policy.backoff(attempt))
 
 
 def _strip_html_to_text(html: str) -> str:
@@ -28,6 +100,19 @@ def _strip_html_to_text(html: str) -> str:
     return " ".join(text.split())
 
 
+def _extract_links(nodes: List[Tag]) -> List[str]:
+    links: List[str] = []
+    seen = set()
+    for node in nodes:
+        anchors = [node] if node.name == "a" else node.find_all("a", href=True)
+        for a in anchors:
+            title = title_from_href(a.get("href"))
+            if title and title not in seen:
+                seen.add(title)
+                links.append(title)
+    return links
+
+
 def _collect_lead_section(parser_output: Tag) -> Optional[WikiSection]:
     children: List[Tag] = [c for c in parser_output.children if isinstance(c, Tag)]
     lead_nodes: List[Tag] = []
@@ -54,6 +139,7 @@ def _collect_lead_section(parser_output: Tag) -> Optional[WikiSection]:
         heading_text=None,
         html=html,
         plain_text=plain_text,
+        links=_extract_links(lead_nodes),
     )
 
 
@@ -98,6 +184,7 @@ def _collect_heading_sections(parser_output: Tag) -> List[WikiSection]:
                 heading_text=heading_text,
                 html=html,
                 plain_text=plain_text,
+                links=_extract_links(content_nodes),
             )
         )
 
@@ -140,8 +227,12 @@ def _extract_tables(parser_output: Tag) -> List[WikiTable]:
     return tables
 
 
-def scrape_wiki_page(entry: WikiManifestEntry) -> WikiPageStructured:
-    html = _fetch_html(entry.url)
+def scrape_wiki_page(
+    entry: WikiManifestEntry,
+    policy: RetryPolicy | None = None,
+    on_attempt: Callable[[], None] | None = None,
+) -> WikiPageStructured:
+    html = _fetch_html(entry.url, policy=policy, on_attempt=on_attempt)
     soup = BeautifulSoup(html, "lxml")
 
     page_title_tag = soup.select_one("#firstHeading .mw-page-title-main")
@@ -179,31 +270,92 @@ def scrape_wiki_page(entry: WikiManifestEntry) -> WikiPageStructured:
     return page
 
 
-def scrape_all_to_files(output_dir: Path | None = None) -> Path:
+def _page_to_json(page: WikiPageStructured) -> dict:
+    return {
+        "page_id": page.page_id,
+        "page_title": page.page_title,
+        "url": page.url,
+        "meta": {
+            "last_updated_version": page.last_updated_version,
+        },
+        "sections": [asdict(s) for s in page.sections],
+        "tables": [asdict(t) for t in page.tables],
+    }
+
+
+def scrape_page_to_file(
+    entry: WikiManifestEntry,
+    out_root: Path,
+    journal: ScrapeJournal,
+    policy: RetryPolicy | None = None,
+) -> dict | None:
+    """
+    Scrape one page, write <out_root>/<page_id>.json atomically and record
+    the outcome in the journal. Returns the page JSON, or None on failure.
+    """
+    journal.mark_pending(entry.page_id, entry.url)
+    try:
+        page = scrape_wiki_page(entry, policy=policy, on_attempt=lambda: journal.count_attempt(entry.page_id))
+    except (requests.RequestException, RuntimeError) as e:
+        logger.error("Giving up on %s for this run: %s", entry.page_id, e)
+        journal.mark_failed(entry.page_id, entry.url, str(e))
+        return None
+
+    data = _page_to_json(page)
+    target = out_root / f"{entry.page_id}.json"
+    atomic_write_text(target, json.dumps(data, ensure_ascii=False, indent=2))
+    journal.mark_done(entry.page_id, entry.url)
+    return data
+
+
+def scrape_all_to_files(
+    output_dir: Path | None = None,
+    resume: bool = True,
+    manifest: List[WikiManifestEntry] | None = None,
+    policy: RetryPolicy | None = None,
+    journal_path: Path | None = None,
+) -> Path:
+    """
+    Scrape every manifest page to <output_dir>/<page_id>.json.
+
+    Progress is recorded in a job journal (default
+    <output_dir>/scrape_journal.jsonl). With `resume` (the default) pages
+    already marked done are skipped; a page that still fails after the
+    retry policy is marked failed and the run moves on instead of aborting.
+    A done page whose manifest URL has changed since is fetched again.
+    `resume=False` clears the journal and refetches everything.
+    """
     out_root = output_dir or (OUTPUTS_DIR / "wiki_structured")
     out_root.mkdir(parents=True, exist_ok=True)
 
-    manifest = load_manifest()
-    for entry in manifest:
-        page = scrape_wiki_page(entry)
-        target = out_root / f"{entry.page_id}.json"
-        data = {
-            "page_id": page.page_id,
-            "page_title": page.page_title,
-            "url": page.url,
-            "meta": {
-                "last_updated_version": page.last_updated_version,
-            },
-            "sections": [asdict(s) for s in page.sections],
-            "tables": [asdict(t) for t in page.tables],
-        }
-        target.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
-
+    journal = ScrapeJournal(journal_path or (out_root / "scrape_journal.jsonl"))
+    if not resume:
+        journal.reset()
+
+    manifest = manifest if manifest is not None else load_manifest()
+    by_id = {entry.page_id: entry for entry in manifest}
+    todo = journal.pending({pid: entry.url for pid, entry in by_id.items()})
+    # A page marked done whose file has gone missing is fetched again.
+    queued = set(todo)
+    todo += [
+        pid for pid in by_id
+        if pid not in queued and not (out_root / f"{pid}.json").exists()
+    ]
+    logger.info("Scraping %d of %d pages", len(todo), len(manifest))
+
+    for page_id in todo:
+        scrape_page_to_file(by_id[page_id], out_root, journal, policy=policy)
+
+    counts = journal.counts()
+    logger.info("Scrape journal: %d done, %d failed", counts["done"], counts["failed"])
     return out_root
 
 
 def main() -> None:
-    out_dir = scrape_all_to_files()
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    out_dir = scrape_all_to_files(resume="--restart" not in sys.argv[1:])
     print(f"Wrote structured wiki JSON to {out_dir}")
 
 
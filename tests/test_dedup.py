@@ -0,0 +1,91 @@
+import json
+import tempfile
+import unittest
+from dataclasses import asdict
+from pathlib import Path
+
+from melvor_wiki_bot.rag.chunking import make_chunks, make_chunks_for_page
+from melvor_wiki_bot.rag.dedup import dedup_chunks
+from melvor_wiki_bot.rag.index import build_index
+from melvor_wiki_bot.rag.retrieval import search_chunks
+
+
+NAV_TEXT = (
+    "Skills Attack Strength Defence Hitpoints Ranged Magic Prayer Slayer "
+    "Woodcutting Fishing Firemaking Cooking Mining Smithing Thieving Farming"
+)
+
+
+def _page(page_id: str, sections: list) -> dict:
+    return {
+        "page_id": page_id,
+        "page_title": page_id.title(),
+        "url": f"https://wiki.example/w/{page_id}",
+        "sections": [
+            {"heading_level": 2, "heading_id": f"s{i}", "heading_text": f"S{i}", "plain_text": text}
+            for i, text in enumerate(sections)
+        ],
+    }
+
+
+class TestDedup(unittest.TestCase):
+    def test_near_duplicates_collapse_with_back_references(self):
+        chunks = []
+        chunks += make_chunks_for_page(_page("ranged", ["Ranged uses bows and arrows.", NAV_TEXT]), "combat_skill")
+        chunks += make_chunks_for_page(_page("magic", ["Magic uses runes and spells.", NAV_TEXT + "."]), "combat_skill")
+        chunks += make_chunks_for_page(_page("slayer", [NAV_TEXT]), "combat_skill")
+
+        canonical = dedup_chunks(chunks)
+
+        self.assertEqual([c.chunk_id for c in canonical], ["ranged__0", "ranged__1", "magic__0"])
+        refs = canonical[1].meta["duplicates"]
+        self.assertEqual([r["page_id"] for r in refs], ["magic", "slayer"])
+
+    def test_make_chunks_writes_deduplicated_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            structured = root / "structured"
+            structured.mkdir()
+            for page in (_page("a_page", [NAV_TEXT, "Only on page a."]), _page("b_page", [NAV_TEXT])):
+                (structured / f"{page['page_id']}.json").write_text(json.dumps(page), encoding="utf-8")
+
+            path = make_chunks(structured_dir=structured, output_dir=root / "out")
+            rows = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+            self.assertEqual(len(rows), 2)
+            self.assertEqual(rows[0]["meta"]["duplicates"][0]["chunk_id"], "b_page__0")
+
+            path = make_chunks(structured_dir=structured, output_dir=root / "out", dedup=False)
+            self.assertEqual(len(path.read_text(encoding="utf-8").splitlines()), 3)
+
+    def test_filters_match_and_report_a_single_source(self):
+        chunks = []
+        chunks += make_chunks_for_page(_page("ranged", [NAV_TEXT]), "combat_skill")
+        chunks += make_chunks_for_page(_page("main_page", [NAV_TEXT, "Welcome to the wiki."]), "meta")
+        chunks += make_chunks_for_page(_page("save_management", [NAV_TEXT]), "meta")
+        rows = [asdict(c) for c in dedup_chunks(chunks)]
+        index = build_index({r["chunk_id"]: r for r in rows}, {r["chunk_id"]: [1.0] for r in rows})
+
+        def ids(**filters):
+            return [index.chunk_ids[r] for r in index.candidates(**filters)]
+
+        def found(**filters):
+            return [(r.chunk_id, r.page_id, r.category) for r in search_chunks("x", top_k=10, index=index, **filters)]
+
+        self.assertEqual(ids(exclude={"category": {"meta"}}), ["ranged__0"])
+        self.assertEqual(ids(exclude={"category": {"meta", "combat_skill"}}), [])
+        self.assertEqual(ids(include={"page_id": {"ranged"}, "category": {"meta"}}), [])
+
+        self.assertEqual(
+            found(include={"category": {"meta"}}),
+            [("main_page__0", "main_page", "meta"), ("main_page__1", "main_page", "meta")],
+        )
+        self.assertEqual(
+            found(exclude={"page_id": {"ranged"}}),
+            [("main_page__0", "main_page", "meta"), ("main_page__1", "main_page", "meta")],
+        )
+        self.assertEqual(found(exclude={"category": {"meta"}}), [("ranged__0", "ranged", "combat_skill")])
+        hit = search_chunks("x", top_k=1, index=index, include={"page_id": {"save_management"}})[0]
+        self.assertEqual((hit.page_title, hit.url), ("Save_Management", "https://wiki.example/w/save_management"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from melvor_wiki_bot.config import RETRIEVAL_GOLDEN_SET_PATH
+from melvor_wiki_bot.rag.evaluate import DEFAULT_FILTERS, MODES, format_table, load_golden_set, run_evaluation
+from melvor_wiki_bot.wiki.manifest import load_manifest
+
+from test_index import _chunk, write_corpus
+
+
+class TestEvaluate(unittest.TestCase):
+    def test_default_golden_set_loads(self):
+        golden = load_golden_set(RETRIEVAL_GOLDEN_SET_PATH)
+        self.assertGreaterEqual(len(golden), 1)
+        self.assertIn("page_id", golden[0]["expected"][0])
+
+    def test_golden_targets_pass_their_filters(self):
+        categories = {e.page_id: e.category for e in load_manifest()}
+        golden = load_golden_set(RETRIEVAL_GOLDEN_SET_PATH)
+        self.assertTrue(any(exp["heading_id"] for item in golden for exp in item["expected"]))
+        for item in golden:
+            filters = item.get("filters") or DEFAULT_FILTERS
+            allowed = filters.get("include", {}).get("category")
+            rejected = filters.get("exclude", {}).get("category", [])
+            for expected in item["expected"]:
+                category = categories[expected["page_id"]]
+                with self.subTest(question=item["question"], page_id=expected["page_id"]):
+                    self.assertTrue(allowed is None or category in allowed)
+                    self.assertNotIn(category, rejected)
+
+    def test_report_covers_every_mode(self):
+        chunks = [_chunk(f"page{i}", 0, "guide", "y" * (10 + 37 * i)) for i in range(6)]
+        golden = [
+            {"question": "y" * 10, "expected": [{"page_id": "page0", "heading_id": None}]},
+            {"question": "y" * 47, "expected": [{"page_id": "page1", "heading_id": "h0"}]},
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            chunks_path, emb_path = write_corpus(root, chunks)
+            golden_path = root / "golden.json"
+            golden_path.write_text(json.dumps(golden), encoding="utf-8")
+            out = root / "report.json"
+
+            report = run_evaluation(golden_path, ks=(1, 3), chunks_path=chunks_path, emb_path=emb_path, output_path=out)
+
+            self.assertEqual(list(report), list(MODES))
+            self.assertEqual(report["exact"]["recall"]["@3"], 1.0)
+            self.assertEqual(report["exact"]["mrr"], 1.0)
+            self.assertIn("p90", report["quantized"]["latency_ms"])
+            self.assertEqual(json.loads(out.read_text(encoding="utf-8"))["ks"], [1, 3])
+            self.assertIn("approximate", format_table(report))
+
+
+if __name__ == "__main__":
+    unittest.main()
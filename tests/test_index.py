@@ -0,0 +1,98 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from melvor_wiki_bot.rag.embeddings import embed_texts
+from melvor_wiki_bot.rag.index import load_index
+from melvor_wiki_bot.rag.retrieval import search_chunks
+
+
+def _chunk(page_id: str, idx: int, category: str, text: str, heading_level: int = 2) -> dict:
+    return {
+        "chunk_id": f"{page_id}__{idx}",
+        "page_id": page_id,
+        "page_title": page_id.title(),
+        "url": f"https://wiki.example/w/{page_id}",
+        "heading_level": heading_level,
+        "heading_id": f"h{idx}",
+        "heading_text": f"Heading {idx}",
+        "text": text,
+        "meta": {"section_index": idx, "category": category, "heading_level": heading_level},
+    }
+
+
+def write_corpus(root: Path, chunks: list) -> tuple:
+    chunks_path = root / "wiki_chunks.jsonl"
+    emb_path = root / "wiki_embeddings.jsonl"
+    vectors = embed_texts([c["text"] for c in chunks])
+    with chunks_path.open("w", encoding="utf-8") as f:
+        for c in chunks:
+            f.write(json.dumps(c) + "\n")
+    with emb_path.open("w", encoding="utf-8") as f:
+        for c, vec in zip(chunks, vectors):
+            f.write(json.dumps({"chunk_id": c["chunk_id"], "embedding": vec}) + "\n")
+    return chunks_path, emb_path
+
+
+class TestFilteredSearch(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        root = Path(self._tmp.name)
+        self.chunks = [
+            _chunk("main_page", 0, "meta", "Welcome to the wiki", heading_level=0),
+            _chunk("ranged", 0, "combat_skill", "Ranged uses arrows and bows"),
+            _chunk("ranged", 1, "combat_skill", "Ranged ammo slots"),
+            _chunk("combat_guide", 0, "combat_guide", "Combat guide for new players"),
+            _chunk("atlas_faq", 0, "expansion_faq", "Atlas of Discovery questions"),
+        ]
+        self.chunks_path, self.emb_path = write_corpus(root, self.chunks)
+        self.index = load_index(self.chunks_path, self.emb_path)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_bitmaps_cover_every_row(self):
+        by_category = self.index.bitmaps["category"]
+        combined = 0
+        for mask in by_category.values():
+            combined |= mask
+        self.assertEqual(combined, self.index.all_mask)
+        self.assertEqual(bin(by_category["combat_skill"]).count("1"), 2)
+
+    def test_include_and_exclude(self):
+        rows = self.index.candidates(include={"category": {"combat_skill", "combat_guide"}})
+        self.assertEqual({self.index.chunks[r]["page_id"] for r in rows}, {"ranged", "combat_guide"})
+
+        rows = self.index.candidates(exclude={"category": {"meta"}})
+        self.assertEqual(len(rows), len(self.chunks) - 1)
+
+        rows = self.index.candidates(include={"page_id": {"ranged"}, "heading_level": {2}})
+        self.assertEqual(len(rows), 2)
+
+    def test_search_respects_filters(self):
+        results = search_chunks(
+            "Welcome to the wiki",
+            top_k=10,
+            index=self.index,
+            include={"category": {"expansion_faq"}},
+        )
+        self.assertEqual([r.chunk_id for r in results], ["atlas_faq__0"])
+        self.assertEqual(results[0].category, "expansion_faq")
+
+        results = search_chunks("Welcome", top_k=10, chunks_path=self.chunks_path, emb_path=self.emb_path)
+        self.assertEqual(len(results), len(self.chunks))
+
+    def test_scalar_filter_value(self):
+        rows = self.index.candidates(include={"category": "meta"})
+        self.assertEqual([self.index.chunk_ids[r] for r in rows], ["main_page__0"])
+        rows = self.index.candidates(include={"heading_level": 2})
+        self.assertEqual(len(rows), 4)
+
+    def test_unknown_field_rejected(self):
+        with self.assertRaises(ValueError):
+            self.index.candidates(include={"url": {"x"}})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from melvor_wiki_bot.rag.index import load_index
+from melvor_wiki_bot.rag.link_graph import build_link_graph
+from melvor_wiki_bot.rag.retrieval import search_cascade, search_chunks
+from melvor_wiki_bot.wiki.links import title_from_href
+from melvor_wiki_bot.wiki.scrape import _collect_heading_sections
+
+from test_index import _chunk, write_corpus
+
+
+def _linked(chunk: dict, *titles: str) -> dict:
+    chunk["meta"]["links"] = list(titles)
+    return chunk
+
+
+class TestLinkGraph(unittest.TestCase):
+    def test_title_from_href(self):
+        self.assertEqual(title_from_href("/w/Combat_Guide/Into_the_Abyss#Bosses"), "Combat Guide/Into the Abyss")
+        self.assertEqual(title_from_href("/index.php?title=Main_Page&oldid=74127"), "Main Page")
+        self.assertIsNone(title_from_href("/w/File:Ranged_(skill).svg"))
+        self.assertIsNone(title_from_href("https://example.com/w/Combat"))
+        self.assertIsNone(title_from_href("#Overview"))
+
+    def test_scraper_records_section_links(self):
+        html = """<div class="mw-parser-output">
+        <h2><span class="mw-headline" id="Monsters">Monsters</span></h2>
+        <p>Fight <a href="/w/Golbin">Golbins</a> and <a href="/w/Category:Monsters">others</a>
+        with <a href="/w/Ranged">Ranged</a> or <a href="/w/Ranged#Ammo">ammo</a>.</p>
+        </div>"""
+        parser_output = BeautifulSoup(html, "lxml").select_one(".mw-parser-output")
+        [section] = _collect_heading_sections(parser_output)
+        self.assertEqual(section.links, ["Golbin", "Ranged"])
+
+    def test_csr_adjacency_and_expansion(self):
+        chunks = [
+            _linked(_chunk("combat_guide", 0, "combat_guide", "a" * 40), "Golbin", "Ranged", "Nowhere"),
+            _linked(_chunk("combat_guide", 1, "combat_guide", "b" * 80), "Golbin"),
+            _chunk("golbin", 0, "monster", "c" * 400),
+            _chunk("golbin", 1, "monster", "d" * 900),
+            _linked(_chunk("ranged", 0, "combat_skill", "e" * 2000), "Combat_Guide"),
+        ]
+        chunks[0]["page_title"] = "Combat Guide"
+        chunks[2]["page_title"] = "Golbin"
+        chunks[4]["page_title"] = "Ranged"
+
+        graph = build_link_graph(chunks)
+        self.assertEqual(graph.page_ids, ["combat_guide", "golbin", "ranged"])
+        self.assertEqual(list(graph.linked_pages(0)), [1, 2])
+        self.assertEqual(list(graph.page_chunks(1)), [2, 3])
+        self.assertEqual(graph.neighbors(0), [2, 4])
+        self.assertEqual(list(graph.linking_rows(1)), [0, 1])
+        self.assertEqual(graph.neighbors(2, inbound=True), [0, 1])
+        self.assertEqual(graph.num_edges, 4)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            index = load_index(*write_corpus(Path(tmp), chunks))
+            results = search_chunks("a" * 40, top_k=1, index=index, expand_links=2)
+            filtered = search_chunks(
+                "a" * 40, top_k=1, index=index, expand_links=2, exclude={"category": {"monster"}}
+            )
+            cascaded = search_cascade("a" * 40, top_k=1, index=index, expand_links=2, exclude={"category": {"monster"}})
+        self.assertEqual([r.chunk_id for r in results], ["combat_guide__0", "golbin__0", "ranged__0"])
+        self.assertEqual(results[1].linked_from, "combat_guide__0")
+        self.assertEqual(results[1].score, results[0].score)
+        self.assertEqual([r.chunk_id for r in filtered], ["combat_guide__0", "ranged__0"])
+        self.assertEqual([r.chunk_id for r in cascaded], ["combat_guide__1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from melvor_wiki_bot.pipeline import run_pipeline
+from melvor_wiki_bot.rag.embeddings import text_key
+from melvor_wiki_bot.wiki.manifest import WikiManifestEntry
+from melvor_wiki_bot.wiki.scrape import RetryPolicy
+
+from test_scrape_resume import FlakyWiki
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.wiki = FlakyWiki()
+        self.wiki.broken = False
+        self._tmp = tempfile.TemporaryDirectory()
+        root = Path(self._tmp.name)
+        self.structured = root / "structured"
+        self.out = root / "chunks"
+        self.manifest = [
+            WikiManifestEntry(page_id=t.lower(), title=t, url=self.wiki.url(t), category="guide")
+            for t in ("Ok", "Throttled", "Broken")
+        ]
+
+    def tearDown(self):
+        self.wiki.close()
+        self._tmp.cleanup()
+
+    def _run(self, **kwargs):
+        return run_pipeline(
+            manifest=self.manifest,
+            structured_dir=self.structured,
+            output_dir=self.out,
+            policy=RetryPolicy(max_attempts=3, base_delay=0.001),
+            embed_batch_size=2,
+            queue_size=1,
+            **kwargs,
+        )
+
+    def test_end_to_end_and_resume(self):
+        result = self._run()
+        self.assertEqual(result.pages, 3)
+        chunks = [json.loads(l) for l in result.chunks_path.read_text(encoding="utf-8").splitlines()]
+        embs = [json.loads(l) for l in result.embeddings_path.read_text(encoding="utf-8").splitlines()]
+        self.assertEqual(len(chunks), result.chunks)
+        self.assertEqual({c["chunk_id"] for c in chunks}, {e["chunk_id"] for e in embs})
+        self.assertEqual(chunks[0]["meta"]["category"], "guide")
+        self.assertTrue((self.structured / "ok.json").exists())
+
+        hits = sum(self.wiki.hits.values())
+        again = self._run()
+        self.assertEqual(sum(self.wiki.hits.values()), hits)
+        self.assertEqual(again.chunks, result.chunks)
+
+        self.manifest[0].url += "?oldid=2"
+        self._run()
+        self.assertEqual(sum(self.wiki.hits.values()), hits + 1)
+
+    def test_failed_refetch_keeps_last_good_page(self):
+        first = self._run()
+        self.wiki.broken = True
+        self.manifest[2].url += "?oldid=2"
+
+        result = self._run()
+        self.assertEqual(result.failed_pages, ["broken"])
+        self.assertEqual(result.pages, 3)
+        chunks = [json.loads(l) for l in result.chunks_path.read_text(encoding="utf-8").splitlines()]
+        self.assertIn("broken", {c["page_id"] for c in chunks})
+        self.assertEqual(result.chunks, first.chunks)
+
+    def test_custom_backend_keys_rows_by_its_model(self):
+        with self.assertRaises(ValueError):
+            self._run(embed_fn=lambda texts: [[1.0] for _ in texts])
+
+        result = self._run(embed_fn=lambda texts: [[1.0] for _ in texts], embedding_model="ones-v0")
+        chunks = [json.loads(l) for l in result.chunks_path.read_text(encoding="utf-8").splitlines()]
+        embs = [json.loads(l) for l in result.embeddings_path.read_text(encoding="utf-8").splitlines()]
+        self.assertEqual(embs[0]["text_key"], text_key(chunks[0]["text"], "ones-v0"))
+        self.assertNotEqual(embs[0]["text_key"], text_key(chunks[0]["text"]))
+
+    def test_failed_stage_leaves_previous_artifacts(self):
+        first = self._run()
+        before = first.chunks_path.read_text(encoding="utf-8")
+
+        def boom(texts):
+            raise ValueError("embedding backend down")
+
+        with self.assertRaises(ValueError):
+            self._run(embed_fn=boom, embedding_model="boom-v0")
+        self.assertEqual(first.chunks_path.read_text(encoding="utf-8"), before)
+        self.assertEqual([p.name for p in self.out.iterdir() if p.name.endswith(".tmp")], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
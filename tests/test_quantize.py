@@ -0,0 +1,67 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from melvor_wiki_bot.rag.embeddings import write_embeddings
+from melvor_wiki_bot.rag.index import load_index
+from melvor_wiki_bot.rag.quantize import quantize_vectors
+from melvor_wiki_bot.rag.retrieval import search_chunks
+
+from test_index import _chunk, write_corpus
+
+
+class TestQuantize(unittest.TestCase):
+    def test_roundtrip_error_is_small(self):
+        vectors = [[3821.0, 1.0, 6.0], [-0.5, 0.25, 0.0], [0.0, 0.0, 0.0]]
+        for dtype in ("int8", "float16"):
+            matrix = quantize_vectors(vectors, dtype)
+            self.assertEqual(len(matrix), 3)
+            for row, vec in enumerate(vectors):
+                scale = max(abs(x) for x in vec) or 1.0
+                for got, want in zip(matrix.row(row), vec):
+                    self.assertAlmostEqual(got / scale, want / scale, delta=0.01)
+        self.assertLess(quantize_vectors(vectors, "int8").nbytes, len(vectors) * 3 * 8)
+
+    def test_quantized_search_matches_exact_after_rescoring(self):
+        texts = ["x" * n for n in (5, 17, 42, 99, 128, 301, 777, 1024)]
+        chunks = [_chunk("page", i, "guide", t) for i, t in enumerate(texts)]
+        with tempfile.TemporaryDirectory() as tmp:
+            chunks_path, emb_path = write_corpus(Path(tmp), chunks)
+            exact = load_index(chunks_path, emb_path)
+            for dtype in ("int8", "float16"):
+                index = load_index(chunks_path, emb_path, quantize=dtype, keep_exact=False)
+                self.assertEqual(index.vectors, [])
+                for query in texts:
+                    want = [(r.chunk_id, round(r.score, 9)) for r in search_chunks(query, top_k=3, index=exact)]
+                    got = [(r.chunk_id, round(r.score, 9)) for r in search_chunks(query, top_k=3, index=index)]
+                    self.assertEqual(got, want)
+
+    def test_rescoring_survives_atomic_rewrite_of_embeddings(self):
+        texts = ["x" * n for n in (5, 17, 42, 99)]
+        chunks = [_chunk("page", i, "guide", t) for i, t in enumerate(texts)]
+        with tempfile.TemporaryDirectory() as tmp:
+            chunks_path, emb_path = write_corpus(Path(tmp), chunks)
+            index = load_index(chunks_path, emb_path, quantize="int8", keep_exact=False)
+            before = [(r.chunk_id, r.score) for r in search_chunks(texts[2], top_k=2, index=index)]
+
+            # A fresh run rewrites the file with different rows and offsets.
+            write_embeddings(emb_path, [("other__0", "o", [9.0, 9.0]), ("page__3", "p", [1.0, 2.0, 3.0])])
+
+            after = [(r.chunk_id, r.score) for r in search_chunks(texts[2], top_k=2, index=index)]
+            self.assertEqual(after, before)
+            index.close()
+
+    def test_reader_rejects_mismatched_row(self):
+        chunks = [_chunk("page", i, "guide", "x" * (i + 1)) for i in range(2)]
+        with tempfile.TemporaryDirectory() as tmp:
+            chunks_path, emb_path = write_corpus(Path(tmp), chunks)
+            index = load_index(chunks_path, emb_path, quantize="int8", keep_exact=False)
+            reader = index.exact_reader
+            reader.offsets["page__0"], reader.offsets["page__1"] = reader.offsets["page__1"], reader.offsets["page__0"]
+            with self.assertRaises(RuntimeError):
+                index.exact_vectors([0])
+            index.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from melvor_wiki_bot.rag.index import load_index
+from melvor_wiki_bot.rag.rerank import RerankConfig, rerank
+from melvor_wiki_bot.rag.retrieval import search_cascade
+
+from test_index import _chunk, write_corpus
+
+
+class TestRerank(unittest.TestCase):
+    def test_title_and_heading_matches_win_over_flat_scores(self):
+        a = _chunk("fishing", 0, "skill", "Catch fish at spots")
+        b = _chunk("summoning", 2, "combat_skill", "Familiars and tablets")
+        b["heading_text"] = "Synergies"
+        c = _chunk("main_page", 0, "meta", "Summoning synergies news")
+
+        order = rerank("summoning synergies", [(a, 0.9), (c, 0.9), (b, 0.85)])
+        self.assertEqual(order[0][0], 2)
+        self.assertEqual(order[-1][0], 1)  # meta prior
+
+    def test_duplicate_titles_do_not_boost(self):
+        nav = _chunk("fishing", 3, "skill", "Skills Attack Strength Magic")
+        nav["meta"]["duplicates"] = [
+            {"chunk_id": "magic__3", "page_id": "magic", "page_title": "Magic", "heading_text": "Magic Spells"},
+        ]
+        magic = _chunk("magic", 0, "combat_skill", "Runes and spellbooks")
+        magic["heading_text"] = "Magic Spells"
+
+        order = rerank("magic spells", [(nav, 0.9), (magic, 0.8)])
+        self.assertEqual(order[0][0], 1)
+        self.assertEqual(order[1][1], 0.9)
+
+    def test_zero_budget_keeps_first_stage_order(self):
+        cands = [(_chunk("p", i, "guide", "t"), 1.0 - i / 10) for i in range(5)]
+        cands[4][0]["page_title"] = "Summoning"
+        order = rerank("summoning", cands, RerankConfig(budget_ms=0.0))
+        self.assertEqual([pos for pos, _ in order], [0, 1, 2, 3, 4])
+
+    def test_cascade_uses_headings(self):
+        chunks = [_chunk("page", i, "guide", "x" * 100) for i in range(6)]
+        chunks[5]["heading_text"] = "Slayer Coins"
+        with tempfile.TemporaryDirectory() as tmp:
+            index = load_index(*write_corpus(Path(tmp), chunks))
+            results = search_cascade("slayer coins", top_k=2, index=index)
+        self.assertEqual(results[0].chunk_id, "page__5")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+import json
+import tempfile
+import threading
+import unittest
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from melvor_wiki_bot.wiki.journal import DONE, FAILED, PENDING, ScrapeJournal
+from melvor_wiki_bot.wiki.manifest import WikiManifestEntry
+from melvor_wiki_bot.wiki.scrape import RetryPolicy, scrape_all_to_files
+
+
+PAGE_HTML = """<html><body>
+<h1 id="firstHeading"><span class="mw-page-title-main">{title}</span></h1>
+<div id="mw-content-text"><div class="mw-parser-output">
+<p>Lead text for {title}.</p>
+<h2><span class="mw-headline" id="Overview">Overview</span></h2>
+<p>Body of {title}.</p>
+</div></div></body></html>"""
+
+
+class FlakyWiki:
+    """
+    /w/Ok always works, /w/Throttled answers 429 + Retry-After twice first,
+    /w/Broken answers 503 until `broken` is cleared, /w/Later always answers
+    429 with an hour-long Retry-After.
+    """
+
+    def __init__(self):
+        self.hits = Counter()
+        self.broken = True
+        wiki = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                title = self.path.split("?", 1)[0].rsplit("/", 1)[-1]
+                wiki.hits[title] += 1
+                if title == "Throttled" and wiki.hits[title] <= 2:
+                    self.send_response(429)
+                    self.send_header("Retry-After", "0")
+                    self.end_headers()
+                    return
+                if title == "Later":
+                    self.send_response(429)
+                    self.send_header("Retry-After", "3600")
+                    self.end_headers()
+                    return
+                if title == "Broken" and wiki.broken:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                body = PAGE_HTML.format(title=title).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, title: str) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}/w/{title}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestResumableScrape(unittest.TestCase):
+    def setUp(self):
+        self.wiki = FlakyWiki()
+        self._tmp = tempfile.TemporaryDirectory()
+        self.out = Path(self._tmp.name)
+        self.manifest = [
+            WikiManifestEntry(page_id=t.lower(), title=t, url=self.wiki.url(t))
+            for t in ("Ok", "Throttled", "Broken")
+        ]
+        self.policy = RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.01)
+
+    def tearDown(self):
+        self.wiki.close()
+        self._tmp.cleanup()
+
+    def _scrape(self, **kwargs):
+        return scrape_all_to_files(self.out, manifest=self.manifest, policy=self.policy, **kwargs)
+
+    def test_failure_does_not_abort_and_resume_fetches_only_unfinished(self):
+        self._scrape()
+
+        journal = ScrapeJournal(self.out / "scrape_journal.jsonl")
+        self.assertEqual(journal.get("ok").state, DONE)
+        self.assertEqual(journal.get("throttled").state, DONE)
+        self.assertEqual(journal.get("broken").state, FAILED)
+        self.assertEqual(journal.get("throttled").attempts, 3)
+        self.assertEqual(self.wiki.hits["Throttled"], 3)
+        self.assertEqual(self.wiki.hits["Broken"], 3)
+        self.assertTrue((self.out / "ok.json").exists())
+        self.assertFalse((self.out / "broken.json").exists())
+
+        self.wiki.broken = False
+        self._scrape()
+
+        self.assertEqual(self.wiki.hits["Ok"], 1)
+        self.assertEqual(self.wiki.hits["Throttled"], 3)
+        self.assertEqual(self.wiki.hits["Broken"], 4)
+        journal = ScrapeJournal(self.out / "scrape_journal.jsonl")
+        self.assertEqual(journal.get("broken").state, DONE)
+        self.assertEqual(journal.get("broken").attempts, 4)
+        page = json.loads((self.out / "broken.json").read_text(encoding="utf-8"))
+        self.assertEqual(page["sections"][1]["heading_id"], "Overview")
+
+    def test_interrupted_fetch_replays_as_pending(self):
+        journal = ScrapeJournal(self.out / "scrape_journal.jsonl")
+        journal.mark_pending("ok", self.manifest[0].url)
+        self.assertEqual(ScrapeJournal(journal.path).get("ok").state, PENDING)
+
+        self.wiki.broken = False
+        self._scrape()
+        self.assertEqual(self.wiki.hits["Ok"], 1)
+
+    def test_long_retry_after_gives_up_for_this_run(self):
+        self.manifest.append(WikiManifestEntry(page_id="later", title="Later", url=self.wiki.url("Later")))
+        self.wiki.broken = False
+        self._scrape()
+        journal = ScrapeJournal(self.out / "scrape_journal.jsonl")
+        self.assertEqual(journal.get("later").state, FAILED)
+        self.assertIn("429", journal.get("later").error)
+        self.assertEqual(self.wiki.hits["Later"], 1)
+
+    def test_changed_url_is_refetched(self):
+        self.wiki.broken = False
+        self._scrape()
+        self.manifest[0].url += "?oldid=2"
+        self._scrape()
+        self.assertEqual(self.wiki.hits["Ok"], 2)
+        self.assertEqual(self.wiki.hits["Broken"], 1)
+        journal = ScrapeJournal(self.out / "scrape_journal.jsonl")
+        self.assertEqual(journal.get("ok").url, self.manifest[0].url)
+
+    def test_restart_refetches_everything(self):
+        self.wiki.broken = False
+        self._scrape()
+        self._scrape(resume=False)
+        self.assertEqual(self.wiki.hits["Ok"], 2)
+        self.assertEqual(ScrapeJournal(self.out / "scrape_journal.jsonl").get("ok").attempts, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
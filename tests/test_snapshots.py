@@ -0,0 +1,102 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from melvor_wiki_bot.rag import snapshots
+from melvor_wiki_bot.rag.embeddings import embed_texts, text_key
+from melvor_wiki_bot.rag.retrieval import search_chunks
+from melvor_wiki_bot.rag.snapshots import SnapshotStore
+
+from test_index import _chunk
+
+
+class TestSnapshots(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.store = SnapshotStore(Path(self._tmp.name))
+        self.v1 = [
+            _chunk("combat", 0, "combat_overview", "Combat has three styles"),
+            _chunk("ranged", 0, "combat_skill", "Ranged uses bows"),
+        ]
+        self.v2 = [
+            self.v1[0],
+            _chunk("ranged", 0, "combat_skill", "Ranged uses bows and throwing knives"),
+            _chunk("magic", 0, "combat_skill", "Magic uses runes"),
+        ]
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _count(self, kind):
+        return len(list((self.store.objects_dir / kind).rglob("*.json")))
+
+    def test_unchanged_objects_are_shared(self):
+        self.store.create("v1", self.v1)
+        self.store.create("v2", self.v2)
+        self.assertEqual(self._count("chunks"), 4)
+        self.assertEqual(self._count("vectors"), 4)
+
+        old = self.store.load_index("v1")
+        new = self.store.load_index("v2")
+        self.assertIs(old.chunks[0], new.chunks[0])
+        self.assertIs(old.vectors[0], new.vectors[0])
+        self.assertEqual(len(new), 3)
+
+    def test_snapshots_are_immutable(self):
+        self.store.create("v1", self.v1)
+        with self.assertRaises(FileExistsError):
+            self.store.create("v1", self.v2)
+        with self.assertRaises(ValueError):
+            self.store.create("../escape", self.v1)
+
+    def test_stale_supplied_embeddings_are_reembedded(self):
+        ranged, magic = self.v2[1], self.v2[2]
+        supplied = {
+            ranged["chunk_id"]: (text_key(self.v1[1]["text"]), [99.0, 99.0]),
+            magic["chunk_id"]: (text_key(magic["text"]), [7.0, 7.0]),
+        }
+        self.store.create("v2", self.v2, embeddings=supplied)
+        index = self.store.load_index("v2")
+        vectors = dict(zip(index.chunk_ids, index.vectors))
+        self.assertEqual(vectors[ranged["chunk_id"]], embed_texts([ranged["text"]])[0])
+        self.assertEqual(vectors[magic["chunk_id"]], [7.0, 7.0])
+
+    def test_evict_releases_unshared_objects(self):
+        self.store.create("v1", self.v1)
+        self.store.create("v2", self.v2)
+        self.store.load_index("v1")
+        self.store.load_index("v2")
+        self.assertEqual(len(self.store._chunks), 4)
+
+        self.store.evict("v1")
+        rows = self.store.read_manifest("v2")["rows"]
+        self.assertEqual(set(self.store._chunks), {ckey for ckey, _ in rows})
+        self.assertEqual(set(self.store._vectors), {vkey for _, vkey in rows})
+
+        self.store.evict("v2")
+        self.assertEqual((self.store._chunks, self.store._vectors), ({}, {}))
+
+    def test_promote_switches_retrieval(self):
+        self.store.create("v1", self.v1)
+        self.store.create("v2", self.v2)
+        self.assertIsNone(self.store.current())
+        with self.assertRaises(FileNotFoundError):
+            self.store.promote("v3")
+
+        self.store.promote("v1")
+        self.assertEqual(len(self.store.load_index()), 2)
+        self.store.promote("v2")
+        self.assertEqual(self.store.current(), "v2")
+        self.assertEqual(len(self.store.load_index()), 3)
+
+        previous = snapshots._default_store
+        snapshots._default_store = self.store
+        try:
+            results = search_chunks("Magic uses runes", top_k=1, snapshot="v2")
+        finally:
+            snapshots._default_store = previous
+        self.assertEqual(results[0].chunk_id, "magic__0")
+
+
+if __name__ == "__main__":
+    unittest.main()